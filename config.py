@@ -1,2 +1,19 @@
 # config.py
-cached_instruments = []
\ No newline at end of file
+cached_instruments = []
+
+# Where strategy rows are stored: "consolidated" keeps every group in the
+# shared strategy_rows table (groups from older versions are migrated at
+# startup, keeping each original table as <name>_premigration); "physical"
+# keeps one SQLite table per group.
+STRATEGY_STORAGE = "consolidated"
+
+# Prebuilt binary snapshots of the instrument master (see instrument_snapshot),
+# in this directory next to the instrument DB (an absolute path also works)
+INSTRUMENT_SNAPSHOT_DIR = "instrument_cache"
+
+# Daily instrument DBs: the newest file matching the pattern in this directory
+# is loaded, and swapped in while the app runs when a newer one appears.
+# None means the directory of the bundled DB.
+INSTRUMENT_DB_DIR = None
+INSTRUMENT_DB_PATTERN = "*DB.db3"
+INSTRUMENT_POLL_SECONDS = 60
@@ -1,11 +1,128 @@
 import sqlite3
 import hashlib
+import threading
+import queue
+
+import strategy_store
+
+DB_PATH = "users.db"
+POOL_SIZE = 4  # idle connections kept open; busier moments open short-lived extras
+BUSY_TIMEOUT = 5.0  # seconds to wait on a locked database before failing
+STATEMENT_CACHE_SIZE = 256
+
+
+class PooledConnection:
+    """A pooled sqlite3 connection. close() hands it back to the pool instead
+    of closing it; anything not committed by then is rolled back, exactly as
+    closing a plain connection would. Used as a context manager it commits on
+    success, rolls back on error and is returned to the pool either way.
+    """
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.release(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self._conn.commit()
+        finally:
+            self.close()
+        return False
+
+    def __del__(self):
+        # Safety net for code paths that return early without close()
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """Small pool of WAL-mode connections to one SQLite file.
+
+    Connections are opened with check_same_thread=False so the Tk thread and
+    TCP callback threads can share them; each checkout is exclusive. WAL lets
+    readers proceed while a writer commits, synchronous=NORMAL drops the
+    per-commit fsync of the WAL, and each connection keeps its own cache of
+    prepared statements.
+    """
+
+    def __init__(self, db_path=DB_PATH, size=POOL_SIZE, timeout=BUSY_TIMEOUT,
+                 cached_statements=STATEMENT_CACHE_SIZE):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self._idle = queue.LifoQueue()
+
+    def _open(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False,
+                               cached_statements=self.cached_statements)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+        return conn
+
+    def connect(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._open()
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            return
+        if self._idle.qsize() < self.size:
+            self._idle.put(conn)
+        else:
+            conn.close()
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path=DB_PATH):
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is None:
+            pool = _pools[db_path] = ConnectionPool(db_path)
+        return pool
+
+
+def connect(db_path=DB_PATH):
+    """Check a connection out of the shared pool for ``db_path``."""
+    return get_pool(db_path).connect()
 
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
 def init_db():
-    conn = sqlite3.connect("users.db")
+    conn = connect()
     c = conn.cursor()
 
     # Enable foreign keys
@@ -59,6 +176,12 @@ def init_db():
         );
     """)
 
+    strategy_store.init_storage(conn)
+    conn.commit()
+    if strategy_store.default_storage() == strategy_store.STORAGE_CONSOLIDATED:
+        strategy_store.migrate_physical_tables(conn)
+        conn.commit()
+    strategy_store.upgrade_physical_tables(conn)
     conn.commit()
     conn.close()
 
@@ -67,7 +190,7 @@ def add_user(full_name, email, password):
         return False  # Avoid empty insert
     password_hash = hash_password(password)
     try:
-        conn = sqlite3.connect("users.db")
+        conn = connect()
         c = conn.cursor()
         c.execute("INSERT INTO users (full_name, email, password) VALUES (?, ?, ?)", (full_name, email, password_hash))
         conn.commit()
@@ -78,7 +201,7 @@ def add_user(full_name, email, password):
 
 def verify_user(email, password):
     password_hash = hash_password(password)
-    conn = sqlite3.connect("users.db")
+    conn = connect()
     c = conn.cursor()
     c.execute("SELECT * FROM users WHERE email=? AND password=?", (email, password_hash))
     result = c.fetchone()
@@ -86,7 +209,7 @@ def verify_user(email, password):
     return result is not None
 
 def get_user_id(email):
-    conn = sqlite3.connect("users.db")
+    conn = connect()
     c = conn.cursor()
     c.execute("SELECT id FROM users WHERE email=?", (email,))
     result = c.fetchone()
@@ -94,7 +217,7 @@ def get_user_id(email):
     return result[0] if result else None
 
 def get_workspaces(user_id):
-    conn = sqlite3.connect("users.db")
+    conn = connect()
     c = conn.cursor()
     c.execute("SELECT id, name, is_default FROM workspaces WHERE user_id=?", (user_id,))
     result = c.fetchall()
@@ -102,7 +225,7 @@ def get_workspaces(user_id):
     return result
 
 def create_workspace(user_id, name, theme="light", icon="📁", set_as_default=False):
-    conn = sqlite3.connect("users.db")
+    conn = connect()
     c = conn.cursor()
     if set_as_default:
         # Unset all other defaults
@@ -113,7 +236,7 @@ def create_workspace(user_id, name, theme="light", icon="📁", set_as_default=F
     conn.close()
 
 def set_default_workspace(workspace_id, user_id):
-    conn = sqlite3.connect("users.db")
+    conn = connect()
     c = conn.cursor()
     c.execute("UPDATE workspaces SET is_default=0 WHERE user_id=?", (user_id,))
     c.execute("UPDATE workspaces SET is_default=1 WHERE id=? AND user_id=?", (workspace_id, user_id))
@@ -121,7 +244,7 @@ def set_default_workspace(workspace_id, user_id):
     conn.close()
 
 def get_workspace_by_id(workspace_id):
-    conn = sqlite3.connect("users.db")
+    conn = connect()
     c = conn.cursor()
     c.execute("SELECT name, theme, icon FROM workspaces WHERE id=?", (workspace_id,))
     result = c.fetchone()
@@ -129,23 +252,94 @@ def get_workspace_by_id(workspace_id):
     return result
 
 def update_workspace(workspace_id, name, theme, emoji):
-    conn = sqlite3.connect("users.db")
+    conn = connect()
     cur = conn.cursor()
     cur.execute("UPDATE workspaces SET name=?, theme=?, icon=? WHERE id=?", (name, theme, emoji, workspace_id))
     conn.commit()
     conn.close()
 
 def delete_workspace(workspace_id):
-    conn = sqlite3.connect("users.db")
+    conn = connect()
     cur = conn.cursor()
     cur.execute("DELETE FROM workspaces WHERE id=?", (workspace_id,))
     conn.commit()
     conn.close()
 
 def get_default_workspace_id(user_id):
-    conn = sqlite3.connect("users.db")
+    conn = connect()
     c = conn.cursor()
     c.execute("SELECT id FROM workspaces WHERE user_id=? AND is_default=1", (user_id,))
     result = c.fetchone()
     conn.close()
-    return result[0] if result else None
\ No newline at end of file
+    return result[0] if result else None
+
+
+class StatusWriteBuffer:
+    """Collects row STATUS transitions and writes them in one transaction.
+
+    Callers queue changes with set_status(); flush() turns everything queued
+    so far into one executemany per table inside a single commit.
+    A row that changes twice before a flush is only written once.
+    """
+
+    def __init__(self, db_path=DB_PATH, max_rows=500):
+        self.db_path = db_path
+        self.max_rows = max_rows
+        self._pending = {}  # (TableRef, row_id) -> status
+        self._lock = threading.Lock()
+
+    def set_status(self, table, row_id, status):
+        with self._lock:
+            self._pending[(table, row_id)] = status
+            full = len(self._pending) >= self.max_rows
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Write everything queued; returns the number of rows taken off the queue.
+
+        Each table is applied under its own savepoint, so one failing table
+        does not lose the others' writes. Rows that could not be written are
+        queued again (unless a newer status arrived meanwhile) and retried by
+        the next flush; rows of a table whose storage is gone are dropped.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        grouped = {}
+        for (table, row_id), status in pending.items():
+            grouped.setdefault(table, []).append((status, row_id))
+
+        failed = {}
+        conn = connect(self.db_path)
+        try:
+            for table, params in grouped.items():
+                conn.execute("SAVEPOINT status_flush")
+                try:
+                    strategy_store.set_statuses(conn, table, params)
+                    conn.execute("RELEASE status_flush")
+                except sqlite3.Error as e:
+                    conn.execute("ROLLBACK TO status_flush")
+                    conn.execute("RELEASE status_flush")
+                    if isinstance(e, sqlite3.OperationalError) and "no such table" in str(e):
+                        print(f"⚠️ Dropping {len(params)} status writes for {table.table_name}: {e}")
+                    else:
+                        print(f"❌ Status flush failed for {table.table_name} ({len(params)} rows), will retry: {e}")
+                        failed.update(((table, row_id), status) for status, row_id in params)
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"❌ Status flush failed for {len(pending)} rows, will retry: {e}")
+            failed = pending
+        finally:
+            conn.close()
+
+        if failed:
+            with self._lock:
+                for key, status in failed.items():
+                    self._pending.setdefault(key, status)  # a newer status queued meanwhile wins
+        return len(pending) - len(failed)
+
+
+status_writes = StatusWriteBuffer()
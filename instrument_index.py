@@ -0,0 +1,555 @@
+import heapq
+import re
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from itertools import chain, islice
+
+import config
+from instrument_store import InstrumentStore
+
+MAX_RESULTS = 100  # matches returned per search; a dropdown never shows more
+_STEP = 1024  # matches of a query's rarest word ranked per search step; each step is 4x the last
+_MERGE_LIMIT = 64  # a prefix matching more terms gets its instruments merged once and kept
+_GRAM = 3
+_PREFIX_END = "\U0010ffff"  # sorts after any character a key can contain
+
+MONTHS = ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec")
+# Words traders type for the same thing the master abbreviates
+_ALIASES = {
+    "january": "jan", "february": "feb", "march": "mar", "april": "apr", "june": "jun", "july": "jul",
+    "august": "aug", "sept": "sep", "september": "sep", "october": "oct", "november": "nov", "december": "dec",
+    "call": "ce", "calls": "ce", "put": "pe", "puts": "pe", "future": "fut", "futures": "fut",
+}
+_WORD = re.compile(r"[a-z]+|\d+(?:\.\d+)?")
+# Monthly contracts tokenize as-is (NIFTY25JUN22000CE); weekly ones pack the
+# expiry as YY + month digit (or O/N/D) + DD: NIFTY2561922000CE
+_WEEKLY = re.compile(r"^([a-z&-]+)(\d{2})([1-9ond])(\d{2})(\d+(?:\.\d+)?)(ce|pe)$")
+_WEEKLY_MONTHS = {**{str(m): m for m in range(1, 10)}, "o": 10, "n": 11, "d": 12}
+_NO_EXPIRY = 999999  # expiry keys are YYMMDD; instruments without one sort last
+
+# Fuzzy search scoring, per query word
+_EXACT_SCORE = 2  # equals a field of the instrument
+_PREFIX_SCORE = 1  # starts a field
+_SYMBOL_BONUS = 2  # equals the underlying symbol
+_RECENT_BONUS = 3  # most recently used instrument; decays with MRU position
+
+
+class TextIndex:
+    """Prefix and substring search over a fixed list of strings.
+
+    Values are kept sorted on their lowercase form, so every prefix match
+    is one contiguous slice found with bisect. Substrings are looked up
+    through a trigram index: only strings containing the query's rarest
+    trigram are checked. Results are prefix matches first, then other
+    substring matches, each group in alphabetical order, capped at ``limit``.
+    """
+
+    def __init__(self, values):
+        self.values = sorted(values, key=str.lower)
+        self.keys = [value.lower() for value in self.values]
+        self._grams = {}  # trigram -> ascending positions in keys
+        for idx, key in enumerate(self.keys):
+            for gram in {key[i:i + _GRAM] for i in range(len(key) - _GRAM + 1)}:
+                self._grams.setdefault(gram, []).append(idx)
+
+    def __len__(self):
+        return len(self.values)
+
+    def _prefix_range(self, text):
+        return bisect_left(self.keys, text), bisect_left(self.keys, text + _PREFIX_END)
+
+    def _contains(self, text):
+        if len(text) < _GRAM:
+            candidates = range(len(self.keys))
+        else:
+            postings = []
+            for i in range(len(text) - _GRAM + 1):
+                posting = self._grams.get(text[i:i + _GRAM])
+                if posting is None:
+                    return
+                postings.append(posting)
+            candidates = min(postings, key=len)
+        keys = self.keys
+        for idx in candidates:
+            if text in keys[idx]:
+                yield idx
+
+    def search(self, text, limit=MAX_RESULTS):
+        text = text.strip().lower()
+        if not text:
+            return self.values[:limit]
+        lo, hi = self._prefix_range(text)
+        results = self.values[lo:min(hi, lo + limit)]
+        if len(results) < limit:
+            for idx in self._contains(text):
+                if lo <= idx < hi:
+                    continue  # already returned as a prefix match
+                results.append(self.values[idx])
+                if len(results) >= limit:
+                    break
+        return results
+
+
+def query_words(text):
+    """Split a query or instrument name into lowercase words at spaces,
+    punctuation and letter/digit boundaries, with aliases normalised."""
+    return [_ALIASES.get(word, word) for word in _WORD.findall(text.lower())]
+
+
+def instrument_terms(name, symbol):
+    """Searchable fields of one instrument plus its expiry sort key (YYMMDD).
+
+    Fields are the words of the name and symbol and the parsed expiry
+    (month, day, year), strike and option type where the name has them.
+    Tokens are matched separately, through the store's token lookup.
+    """
+    words = query_words(name)
+    terms = set(words) | set(query_words(symbol))
+    year = month = day = None
+    weekly = _WEEKLY.match(name.lower())
+    if weekly:
+        root, year, month_code, day, strike, option = weekly.groups()
+        month = _WEEKLY_MONTHS[month_code]
+        terms.update((root, year, MONTHS[month - 1], day, str(int(day)), strike, option))
+    else:
+        for i, word in enumerate(words):
+            if word in MONTHS and month is None:
+                month = MONTHS.index(word) + 1
+                before = words[i - 1] if i else ""
+                # "25JUN" is a year, "26 JUN 2025" a day followed by the year
+                if before.isdigit() and len(before) <= 2:
+                    if i + 1 < len(words) and len(words[i + 1]) == 4 and words[i + 1].startswith("20"):
+                        day, year = before, words[i + 1][2:]
+                    else:
+                        year = before
+    if year:
+        terms.add("20" + year)
+    expiry = int(year) * 10000 + month * 100 + (int(day) if day else 0) if year and month else _NO_EXPIRY
+    return terms, expiry
+
+
+class RecentInstruments:
+    """Most recently used instrument tokens, newest last, for search ranking."""
+
+    def __init__(self, capacity=50):
+        self.capacity = capacity
+        self._tokens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def touch(self, token):
+        with self._lock:
+            self._tokens.pop(str(token), None)
+            self._tokens[str(token)] = None
+            while len(self._tokens) > self.capacity:
+                self._tokens.popitem(last=False)
+
+    def ranks(self):
+        """token -> bonus weight in (0, 1], 1 for the most recent."""
+        with self._lock:
+            tokens = list(self._tokens)
+        count = len(tokens)
+        return {token: (pos + 1) / count for pos, token in enumerate(tokens)}
+
+
+recent = RecentInstruments()
+
+
+class SearchFields:
+    """Fuzzy-search fields of every instrument, as flat arrays.
+
+    Instruments are numbered by expiry rank, nearest first (ties in master
+    order): ``order`` maps that number to the store position and ``rank``
+    back. A term's id is its position in the sorted ``terms`` list, so all
+    terms starting with a word are one id range. ``instrument_terms`` holds
+    each instrument's term ids back to back (instrument i owns
+    ``term_offsets[i]:term_offsets[i + 1]``), and ``postings`` holds each
+    term's instrument numbers the same way, ascending, i.e. nearest expiry
+    first. Any sequence type will do for the arrays, so they can also be
+    views of a snapshot file.
+    """
+
+    __slots__ = ("terms", "instrument_terms", "term_offsets", "postings", "posting_offsets", "order", "rank")
+
+    def __init__(self, terms, instrument_terms, term_offsets, postings, posting_offsets, order, rank):
+        self.terms = terms
+        self.instrument_terms = instrument_terms
+        self.term_offsets = term_offsets
+        self.postings = postings
+        self.posting_offsets = posting_offsets
+        self.order = order  # instrument number -> store position
+        self.rank = rank  # store position -> instrument number
+
+    @classmethod
+    def build(cls, store):
+        term_ids, per_instrument, expiry = {}, [], []
+        for name, symbol, _ in store:
+            fields, key = instrument_terms(name, symbol)
+            per_instrument.append([term_ids.setdefault(field, len(term_ids)) for field in fields])
+            expiry.append(key)
+        order = array("I", sorted(range(len(expiry)), key=expiry.__getitem__))
+        rank = array("I", bytes(4 * len(order)))
+        for idx, pos in enumerate(order):
+            rank[pos] = idx
+
+        terms = sorted(term_ids)
+        term_rank = array("I", bytes(4 * len(terms)))
+        for new_id, term in enumerate(terms):
+            term_rank[term_ids[term]] = new_id
+        flat, term_offsets = array("I"), array("I", [0])
+        counts = [0] * len(terms)
+        for pos in order:
+            for old_id in per_instrument[pos]:
+                term = term_rank[old_id]
+                flat.append(term)
+                counts[term] += 1
+            term_offsets.append(len(flat))
+
+        posting_offsets = array("I", [0])
+        for count in counts:
+            posting_offsets.append(posting_offsets[-1] + count)
+        postings = array("I", bytes(4 * len(flat)))
+        fill = array("I", posting_offsets[:-1])
+        for idx in range(len(order)):
+            for term in flat[term_offsets[idx]:term_offsets[idx + 1]]:
+                postings[fill[term]] = idx
+                fill[term] += 1
+        return cls(terms, flat, term_offsets, postings, posting_offsets, order, rank)
+
+    def parts(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def term_id(self, word):
+        i = bisect_left(self.terms, word)
+        return i if i < len(self.terms) and self.terms[i] == word else None
+
+    def matching_terms(self, word):
+        """Ids of every term starting with ``word``."""
+        lo = bisect_left(self.terms, word)
+        return range(lo, bisect_left(self.terms, word + _PREFIX_END, lo))
+
+    def posting_count(self, terms):
+        """Total postings of a range of term ids."""
+        return self.posting_offsets[terms.stop] - self.posting_offsets[terms.start]
+
+    def posting(self, term):
+        return self.postings[self.posting_offsets[term]:self.posting_offsets[term + 1]]
+
+    def of(self, idx):
+        return self.instrument_terms[self.term_offsets[idx]:self.term_offsets[idx + 1]]
+
+
+class InstrumentIndex:
+    """Lookups over the instrument master, by position in an InstrumentStore.
+
+    The symbol index is built up front; each symbol's name index is built
+    the first time that symbol is searched and kept from then on. The
+    fuzzy-search fields are built by ``prepare_search`` unless passed in
+    ready-made (e.g. from a snapshot).
+    """
+
+    def __init__(self, store, fields=None):
+        self.instruments = store
+        self.source = store  # what config.cached_instruments held when this was built
+        self.symbols = TextIndex(store.symbols)
+        self.fields = fields
+        self._names = {}  # symbol -> TextIndex over its instrument names
+        self._merged = {}  # broad prefix -> ascending numbers of the instruments it matches
+        self._lock = threading.Lock()
+
+    def has_symbol(self, symbol):
+        return bool(self.instruments.symbol_range(symbol))
+
+    def search_symbols(self, text, limit=MAX_RESULTS):
+        return self.symbols.search(text, limit)
+
+    def names(self, symbol):
+        """Instrument names of a symbol in master order."""
+        store = self.instruments
+        return [store.name(pos) for pos in store.symbol_range(symbol)]
+
+    def search_names(self, symbol, text, limit=MAX_RESULTS):
+        with self._lock:
+            names = self._names.get(symbol)
+            if names is None:
+                names = self._names[symbol] = TextIndex(self.names(symbol))
+        return names.search(text, limit)
+
+    def prepare_search(self):
+        """Build the fuzzy-search fields; runs on the first search if not called earlier."""
+        with self._lock:
+            if self.fields is None:
+                self.fields = SearchFields.build(self.instruments)
+            fields = self.fields
+        # Single keystrokes are the broadest queries; have their instruments ready
+        for char in {term[0] for term in fields.terms if term}:
+            self._instruments_starting(char)
+        return fields
+
+    def _instruments_starting(self, word):
+        """(sequence, spans): the instruments matching ``word`` as a prefix are
+        ``sequence[start:end]`` for each span, each span ascending."""
+        fields = self.fields
+        terms = fields.matching_terms(word)
+        if len(terms) <= _MERGE_LIMIT:
+            offsets = fields.posting_offsets
+            return fields.postings, [(offsets[term], offsets[term + 1]) for term in terms]
+        merged = self._merged.get(word)
+        if merged is None:
+            merged = array("I", sorted(set(chain.from_iterable(map(fields.posting, terms)))))
+            with self._lock:
+                merged = self._merged.setdefault(word, merged)
+        return merged, [(0, len(merged))]
+
+    def _symbols_named(self, words):
+        """Symbols that equal one of the (lowercase) query words."""
+        keys, found = self.symbols.keys, []
+        for word in words:
+            i = bisect_left(keys, word)
+            while i < len(keys) and keys[i] == word:
+                found.append(self.symbols.values[i])
+                i += 1
+        return found
+
+    def search(self, text, limit=MAX_RESULTS):
+        """Instruments matching every word of a free-text query, best first.
+
+        Each word must equal or start a field of the instrument (name words,
+        symbol, expiry month/day/year, strike, CE/PE/FUT) or be its token. Exact
+        matches outrank prefix matches, matching the symbol itself and
+        recent use add to the score, and ties go to the nearest expiry.
+
+        Matches are visited nearest expiry first and the walk stops as soon
+        as nothing further on can still make the results, so a broad query
+        costs about as much as a narrow one.
+        """
+        words = list(dict.fromkeys(query_words(text)))
+        if not words:
+            return []
+        fields = self.fields if self.fields is not None else self.prepare_search()
+        store, order, count = self.instruments, fields.order, len(fields.order)
+        exact, tokens = {}, {}
+        for word in words:
+            term = fields.term_id(word)
+            exact[word] = fields.posting(term) if term is not None else ()
+            pos = store.find_token(word) if word.isdigit() else None
+            if pos is not None:
+                tokens[word] = fields.rank[pos]
+        checks = {word: (fields.term_id(word), tokens.get(word), frozenset(fields.matching_terms(word))) for word in words}
+        named = {symbol.lower() for symbol in self._symbols_named(words)}
+
+        def score(idx):
+            terms, points = fields.of(idx), 0
+            for term, token, starts in checks.values():
+                if idx == token or term in terms:
+                    points += _EXACT_SCORE
+                elif not starts.isdisjoint(terms):
+                    points += _PREFIX_SCORE
+                else:
+                    return None
+            if named and store.symbol(order[idx]).lower() in named:
+                points += _SYMBOL_BONUS
+            return points
+
+        # Past the last instrument a word equals exactly, it can only score as a prefix
+        last = {word: max(exact[word][-1] if len(exact[word]) else -1, tokens.get(word, -1)) for word in words}
+
+        def best(live):
+            points = len(words) * _PREFIX_SCORE + len(live) * (_EXACT_SCORE - _PREFIX_SCORE)
+            return points + (_SYMBOL_BONUS if named.intersection(live) else 0)
+
+        kept = []  # min-heap of (score, -idx): the worst result so far on top
+
+        def keep(points, idx):
+            if len(kept) < limit:
+                heapq.heappush(kept, (points, -idx))
+            elif (points, -idx) > kept[0]:
+                heapq.heapreplace(kept, (points, -idx))
+
+        def settled(idx):
+            """True once nothing numbered above ``idx`` can still make the results."""
+            if len(kept) < limit:
+                return False
+            points, worst = kept[0]
+            bound = best([word for word in words if last[word] > idx])
+            return points > bound or (points == bound and -worst <= idx)
+
+        used = set()
+        for token, weight in recent.ranks().items():
+            pos = store.find_token(token)
+            points = None if pos is None else score(fields.rank[pos])
+            if points is not None:
+                used.add(fields.rank[pos])
+                keep(points + _RECENT_BONUS * weight, fields.rank[pos])
+
+        def slices(word, lo, hi):
+            """The parts of the word's postings holding instruments numbered lo to hi - 1."""
+            sequence, spans = sources[word]
+            found = []
+            for start, end in spans:
+                start = bisect_left(sequence, lo, start, end)
+                found.append((start, bisect_left(sequence, hi, start, end)))
+            return found
+
+        def within(word, parts, lo, hi, matched=None):
+            """Instruments in ``parts`` of the word's postings, among ``matched`` if given."""
+            term, token, starts = checks[word]
+            if matched is not None and len(matched) * 16 < sum(end - start for start, end in parts):
+                # Few left: cheaper to check each one than to collect the word's matches
+                return {idx for idx in matched if idx == token or not starts.isdisjoint(fields.of(idx))}
+            sequence = sources[word][0]
+            found = set(chain.from_iterable(sequence[start:end] for start, end in parts))
+            if token is not None and lo <= token < hi:
+                found.add(token)
+            return found if matched is None else matched & found
+
+        def step_end(lo, size):
+            """Where a step from ``lo`` ends so the rarest word has about ``size`` matches in it."""
+            sequence, spans = sources[words[0]]
+            hi = count
+            for start, end in spans:
+                start = bisect_left(sequence, lo, start, end)
+                if end - start > size:
+                    hi = min(hi, sequence[start + size])
+            return hi
+
+        # Rank step by step, nearest expiry first, intersecting what each
+        # word matches within the step, until the results are full
+        sources = {word: self._instruments_starting(word) for word in words}
+        words.sort(key=lambda word: sum(end - start for start, end in sources[word][1]))
+        idx, lo, size = -1, 0, _STEP
+        while lo < count and len(kept) < limit:
+            hi = step_end(lo, size)
+            parts = {word: slices(word, lo, hi) for word in words}
+            matched = None
+            for word in sorted(words, key=lambda word: sum(end - start for start, end in parts[word])):
+                matched = within(word, parts[word], lo, hi, matched)
+                if not matched:
+                    break
+            idx = hi - 1
+            for number in sorted(matched - used):
+                keep(score(number), number)
+                if len(kept) == limit:
+                    idx = number
+                    break
+            lo, size = hi, size * 4
+
+        # The results are full: from here on only instruments equalling some
+        # word exactly can outscore them, so walk those postings instead,
+        # just the rarest one once a word has to be matched exactly
+        def after(word, idx):
+            posting = exact[word]
+            stream = islice(posting, bisect_right(posting, idx), None)
+            return heapq.merge(stream, [tokens[word]]) if tokens.get(word, -1) > idx else stream
+
+        while len(kept) == limit and not settled(idx):
+            live = [word for word in words if last[word] > idx]
+            required = [word for word in live if best([w for w in live if w != word]) <= kept[0][0]]
+            if required:
+                stream = after(min(required, key=lambda word: len(exact[word])), idx)
+            else:
+                stream = heapq.merge(*(after(word, idx) for word in live))
+            worst, previous = kept[0], idx
+            for idx in stream:
+                if idx == previous or idx in used:
+                    continue
+                previous = idx
+                if settled(idx - 1):
+                    return self._ranked(kept)
+                points = score(idx)
+                if points is not None:
+                    keep(points, idx)
+                    if kept[0] != worst and not required:
+                        break  # the bar went up: a word may have to match exactly now
+            else:
+                break
+        return self._ranked(kept)
+
+    def _ranked(self, kept):
+        order, store = self.fields.order, self.instruments
+        return [store[order[-idx]] for _, idx in sorted(kept, reverse=True)]
+
+    def find(self, symbol, name):
+        """The (Name, Symbol, Token) row for a symbol and name, or None."""
+        pos = self.instruments.find_name(symbol, name)
+        return None if pos is None else self.instruments[pos]
+
+    def find_token(self, token):
+        pos = self.instruments.find_token(token)
+        return None if pos is None else self.instruments[pos]
+
+    def resolve(self, text):
+        """The instrument a pasted token or exact instrument name refers to, or None."""
+        text = text.strip()
+        if not text:
+            return None
+        found = self.find_token(text)
+        return found if found is not None else self.find_name(text)
+
+    def find_name(self, name):
+        """The instrument named ``name`` (ignoring case), nearest expiry first if
+        several are, or None. Every word of the name is one of its search
+        terms, so only the rarest word's instruments are compared."""
+        fields = self.fields if self.fields is not None else self.prepare_search()
+        terms = [fields.term_id(word) for word in set(query_words(name))]
+        if not terms or None in terms:
+            return None
+        offsets, store, wanted = fields.posting_offsets, self.instruments, name.lower()
+        for idx in fields.posting(min(terms, key=lambda term: offsets[term + 1] - offsets[term])):
+            if store.name(fields.order[idx]).lower() == wanted:
+                return store[fields.order[idx]]
+        return None
+
+    def details(self, token):
+        """Everything the master knows about a token, or None if it is not listed."""
+        store = self.instruments
+        pos = store.find_token(token)
+        if pos is None:
+            return None
+        name, symbol, token = store[pos]
+        info = {"instrument_token": token, "instrument_name": name, "symbol": symbol}
+        info.update(store.details(pos))
+        return info
+
+
+_index = None
+_index_lock = threading.Lock()
+ready = threading.Event()  # set once the instrument master has been loaded
+
+
+def get_index():
+    """Index over config.cached_instruments, rebuilt only when that is replaced."""
+    global _index
+    with _index_lock:
+        instruments = config.cached_instruments
+        if _index is None or _index.source is not instruments:
+            store = instruments if isinstance(instruments, InstrumentStore) else InstrumentStore.from_rows(instruments)
+            _index = InstrumentIndex(store)
+            _index.source = instruments
+        return _index
+
+
+def instrument_details(token):
+    """Registry lookup by token: name, symbol and enriched fields (lot size,
+    expiry, exchange segment, ...) from the loaded master, without touching
+    the DB. None until the master is loaded or if the token is not listed."""
+    if not token or not ready.is_set():
+        return None
+    return get_index().details(token)
+
+
+def publish(store, fields=None):
+    """Make a freshly loaded master the one every lookup uses.
+
+    ``fields`` are its prebuilt search fields (e.g. from a snapshot);
+    without them they are built here, after the master is already usable.
+    """
+    global _index
+    index = InstrumentIndex(store, fields)
+    with _index_lock:
+        config.cached_instruments = store
+        _index = index
+    ready.set()
+    index.prepare_search()
+    return index
@@ -0,0 +1,109 @@
+import glob
+import os
+import threading
+
+import config
+import instrument_index
+import instrument_snapshot
+
+
+class InstrumentMasterService:
+    """Keeps the instrument master in step with the newest daily DB.
+
+    A background thread looks in ``directory`` for files matching
+    ``pattern`` (daily files such as 20250606DB.db3, so the newest sorts
+    last by name) and loads the newest one. Each poll checks again; a new
+    or changed file is loaded and indexed on the same thread, then swapped
+    in with instrument_index.publish(), which replaces the index in one
+    step. Code holding the previous index (an open instrument popup, say)
+    keeps using it until it asks for the index again.
+
+    A file is only loaded once it looks the same on two polls in a row, so
+    a DB that is still being copied in is not picked up half-written.
+    """
+
+    def __init__(self, directory, pattern="*DB.db3", interval=60.0, fallback_path=None):
+        self.directory = directory
+        self.pattern = pattern
+        self.interval = interval
+        self.fallback_path = fallback_path  # used when the directory has no match
+        self.current = None  # (path, source key) of the loaded master
+        self._pending = None  # (path, source key) seen on the last poll, not loaded yet
+        self._failed = None  # (path, source key) that could not be loaded
+        self._stop = threading.Event()
+        self._thread = None
+
+    def newest_db(self):
+        paths = glob.glob(os.path.join(self.directory, self.pattern))
+        if not paths:
+            return self.fallback_path if self.fallback_path and os.path.exists(self.fallback_path) else None
+        return max(paths, key=lambda path: (os.path.basename(path), os.path.getmtime(path)))
+
+    def check(self, settle=True):
+        """Load the newest DB if it differs from the current one. Returns True if swapped."""
+        path = self.newest_db()
+        if path is None:
+            return False
+        try:
+            candidate = (path, instrument_snapshot.source_key(path))
+        except OSError:
+            return False
+        if candidate == self.current or candidate == self._failed:
+            return False
+        if settle and self.current is not None and candidate != self._pending:
+            self._pending = candidate  # load it next poll if it has not changed by then
+            return False
+
+        self._pending = None
+        try:
+            store, fields = instrument_snapshot.load_instruments(path)
+        except Exception as e:
+            self._failed = candidate
+            print(f"❌ Could not load instruments from {path}: {e}")
+            return False
+        instrument_index.publish(store, fields)
+        previous, self.current = self.current, candidate
+        if previous is None:
+            print("Loaded instruments:", len(store))
+        else:
+            print(f"🔄 Instrument master reloaded from {os.path.basename(path)}: {len(store)} instruments")
+            if previous[0] != path:
+                instrument_snapshot.remove_stale(previous[0])  # yesterday's DB is not coming back
+        return True
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="instrument-master", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        settle = False  # first load straight away
+        while True:
+            try:
+                self.check(settle)
+            except Exception as e:
+                print(f"❌ Instrument master check failed: {e}")
+            settle = True
+            if self._stop.wait(self.interval):
+                return
+
+
+_service = None
+
+
+def start(fallback_path=None):
+    """Start (once) the service for the directory and pattern in config."""
+    global _service
+    if _service is None:
+        directory = getattr(config, "INSTRUMENT_DB_DIR", None) or os.path.dirname(fallback_path or "") or "."
+        _service = InstrumentMasterService(directory,
+                                           pattern=getattr(config, "INSTRUMENT_DB_PATTERN", "*DB.db3"),
+                                           interval=getattr(config, "INSTRUMENT_POLL_SECONDS", 60.0),
+                                           fallback_path=fallback_path)
+    _service.start()
+    return _service
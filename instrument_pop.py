@@ -1,26 +1,25 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import config  # access the shared list
+import instrument_index
 
 instrument_popup = None
 
 def select_instrument(callback):
     global instrument_popup
 
-    instruments = config.cached_instruments
+    if not instrument_index.ready.is_set():
+        messagebox.showinfo("Loading", "The instrument list is still loading. Please try again in a moment.")
+        return
 
-    # Group instruments by symbol
-    symbol_to_instruments = {}
-    for name, symbol, token in instruments:
-        symbol_to_instruments.setdefault(symbol, []).append((name, symbol, token))
-        
-    distinct_symbols = sorted(symbol_to_instruments.keys())
+    # Prebuilt once per instrument master; reopening the popup costs nothing
+    index = instrument_index.get_index()
+    distinct_symbols = index.symbols.values
 
     if instrument_popup is None or not instrument_popup.winfo_exists():
         print("1")
         instrument_popup = tk.Toplevel()
         instrument_popup.title("Select Instrument")
-        instrument_popup.geometry("350x200")
+        instrument_popup.geometry("350x270")
 
         # --- IMPORTANT CHANGE 1: Create a handler for window close (X button) ---
         def on_popup_close():
@@ -29,6 +28,45 @@ def select_instrument(callback):
             instrument_popup = None    # Reset the reference to None
         instrument_popup.protocol("WM_DELETE_WINDOW", on_popup_close) # Use the new handler
 
+        # Quick search: one box over symbol, name, expiry, strike, CE/PE and token.
+        # A search costs a few milliseconds however broad, so every keystroke runs one
+        tk.Label(instrument_popup, text="Quick Search (e.g. nifty 25 jun ce 22000):").pack(pady=(10, 0))
+        instrument_popup.search_var = tk.StringVar()
+        instrument_popup.search_dropdown = ttk.Combobox(
+            instrument_popup,
+            textvariable=instrument_popup.search_var,
+            width=35,
+            state="normal",
+            values=[]
+        )
+        instrument_popup.search_dropdown.pack(pady=5)
+        instrument_popup.search_results = {}  # dropdown text -> (name, symbol, token)
+
+        def on_search_keyrelease(event):
+            if event.keysym in ("Up", "Down", "Return", "KP_Enter", "Escape", "Tab"):
+                return
+            results = instrument_popup.index.search(instrument_popup.search_var.get())
+            instrument_popup.search_results = {f"{name}  ({symbol} · {token})": (name, symbol, token)
+                                               for name, symbol, token in results}
+            instrument_popup.search_dropdown['values'] = list(instrument_popup.search_results)
+
+        def on_search_select(event):
+            instrument = instrument_popup.search_results.get(instrument_popup.search_var.get())
+            if instrument is None and instrument_popup.search_results:
+                # Enter on a typed query takes the best match
+                text, instrument = next(iter(instrument_popup.search_results.items()))
+                instrument_popup.search_var.set(text)
+            if instrument is None:
+                return
+            name, symbol, _ = instrument
+            instrument_popup.symbol_var.set(symbol)
+            on_symbol_change(None)
+            instrument_popup.name_var.set(name)
+
+        instrument_popup.search_dropdown.bind("<KeyRelease>", on_search_keyrelease)
+        instrument_popup.search_dropdown.bind("<<ComboboxSelected>>", on_search_select)
+        instrument_popup.search_dropdown.bind("<Return>", on_search_select)
+
         # SYMBOL Dropdown
         tk.Label(instrument_popup, text="Select Symbol:").pack(pady=(10, 0))
         instrument_popup.symbol_var = tk.StringVar(value="-- Select a Symbol --")
@@ -41,6 +79,7 @@ def select_instrument(callback):
         )
         instrument_popup.symbol_dropdown.pack(pady=5)
         instrument_popup.all_symbols = distinct_symbols
+        instrument_popup.index = index
 
         # Autocomplete filtering for symbols Track scheduled job to debounce
         instrument_popup.symbol_filter_job = None
@@ -58,11 +97,8 @@ def select_instrument(callback):
                 instrument_popup.symbol_dropdown['values'] = ["-- Select a Symbol --"] + instrument_popup.all_symbols
                 return
 
-            # Prioritize prefix matches
-            typed_lower = typed.lower()
-            starts_with = [s for s in instrument_popup.all_symbols if s.lower().startswith(typed_lower)]
-            contains = [s for s in instrument_popup.all_symbols if typed_lower in s.lower() and not s.lower().startswith(typed_lower)]
-            matches = starts_with + contains
+            # Prefix matches first, then substring matches
+            matches = instrument_popup.index.search_symbols(typed)
 
             if matches:
                 instrument_popup.symbol_dropdown['values'] = matches
@@ -107,11 +143,8 @@ def select_instrument(callback):
                 instrument_popup.name_dropdown['values'] = ["-- Select an Instrument --"] + instrument_popup.all_names
                 return
 
-            # Prioritize prefix matches
-            typed_lower = typed.lower()
-            starts_with = [n for n in instrument_popup.all_names if n.lower().startswith(typed_lower)]
-            contains = [n for n in instrument_popup.all_names if typed_lower in n.lower() and not n.lower().startswith(typed_lower)]
-            matches = starts_with + contains
+            # Prefix matches first, then substring matches
+            matches = instrument_popup.index.search_names(instrument_popup.symbol_var.get(), typed)
 
             if matches:
                 instrument_popup.name_dropdown['values'] = matches
@@ -135,10 +168,9 @@ def select_instrument(callback):
                 instrument_popup.all_names = []
                 return
 
-            related = symbol_to_instruments.get(selected_symbol, [])
-            instrument_names = [name for name, _, _ in related]
+            instrument_names = instrument_popup.index.names(selected_symbol)
             instrument_popup.all_names = instrument_names  # <-- Save for autocomplete
-            instrument_popup.name_dropdown['values'] = ["-- Select an Instrument --"] + [name for name, _, _ in related]
+            instrument_popup.name_dropdown['values'] = ["-- Select an Instrument --"] + instrument_names
             instrument_popup.name_var.set("-- Select an Instrument --")
             instrument_popup.name_dropdown.configure(state="normal") # Corrected 'norma;' to 'normal'
 
@@ -150,18 +182,19 @@ def select_instrument(callback):
             selected_symbol = instrument_popup.symbol_var.get()
             selected_name = instrument_popup.name_var.get()
 
-            if selected_symbol not in symbol_to_instruments or selected_name in ("", "-- Select an Instrument --"):
+            if not instrument_popup.index.has_symbol(selected_symbol) or selected_name in ("", "-- Select an Instrument --"):
                 messagebox.showwarning("Incomplete Selection", "Please select both symbol and instrument.")
                 return
 
-            related_instruments = symbol_to_instruments.get(selected_symbol, [])
-            for name, symbol, token in related_instruments:
-                if name == selected_name:
-                    callback(name, symbol, token)
-                    instrument_popup.destroy() # --- IMPORTANT CHANGE 2: Destroy instead of withdraw ---
-                    instrument_popup = None    # Reset the reference to None
-                    return
-            messagebox.showerror("Error", "Selected instrument not found.")
+            instrument = instrument_popup.index.find(selected_symbol, selected_name)
+            if instrument is None:
+                messagebox.showerror("Error", "Selected instrument not found.")
+                return
+            name, symbol, token = instrument
+            instrument_index.recent.touch(token)  # ranks it higher in later quick searches
+            callback(name, symbol, token)
+            instrument_popup.destroy() # --- IMPORTANT CHANGE 2: Destroy instead of withdraw ---
+            instrument_popup = None    # Reset the reference to None
 
         tk.Button(instrument_popup, text="OK", command=on_ok).pack(side="left", padx=20, pady=10)
         # --- IMPORTANT CHANGE 3: Create a separate handler for Cancel button ---
@@ -174,6 +207,11 @@ def select_instrument(callback):
     else:
         # If popup already exists and is not destroyed, bring it to front and reset dropdowns
         print("2")
+        instrument_popup.index = index
+        instrument_popup.all_symbols = distinct_symbols
+        instrument_popup.search_var.set("")
+        instrument_popup.search_dropdown['values'] = []
+        instrument_popup.search_results = {}
         instrument_popup.symbol_var.set("")
         instrument_popup.symbol_dropdown.set('')
         instrument_popup.symbol_dropdown['values'] = instrument_popup.all_symbols
@@ -0,0 +1,177 @@
+import glob
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+import config
+import instrument_store
+from instrument_index import SearchFields
+from instrument_store import InstrumentStore
+
+# Snapshot layout: a header, a table of sections, then each section's data
+# (8-byte aligned). The header records the source DB's mtime and size; a
+# snapshot for any other version of the DB is rebuilt rather than read.
+MAGIC = b"INSTSNAP"
+FORMAT_VERSION = 4
+HEADER = struct.Struct("<8sHHqqI")  # magic, version, byte order, source mtime_ns, source size, sections
+SECTION = struct.Struct("<32sc7xQQQ")  # name, kind, offset, byte length, item count
+_BYTE_ORDER = 1 if sys.byteorder == "little" else 2
+_ALIGN = 8
+
+# kind: b"s" = list of strings, b"B" = raw bytes, anything else = array typecode
+_TEXT, _RAW = b"s", b"B"
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def source_key(db_path):
+    st = os.stat(db_path)
+    return st.st_mtime_ns, st.st_size
+
+
+def snapshot_dir(db_path):
+    """config.INSTRUMENT_SNAPSHOT_DIR, taken relative to the instrument DB's directory."""
+    directory = getattr(config, "INSTRUMENT_SNAPSHOT_DIR", None) or "instrument_cache"
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), directory)
+
+
+def snapshot_path(db_path, key, directory=None):
+    """One file per source version, so a snapshot that is still mapped is never overwritten."""
+    mtime_ns, size = key
+    return os.path.join(directory or snapshot_dir(db_path), f"{os.path.basename(db_path)}.{mtime_ns}-{size}.snap")
+
+
+def _encode(value):
+    if isinstance(value, list):
+        return _TEXT, "\0".join(value).encode(), len(value)
+    if isinstance(value, array):
+        return value.typecode.encode(), value.tobytes(), len(value)
+    if isinstance(value, memoryview) and value.format != "B":
+        return value.format.encode(), value.tobytes(), len(value)
+    return _RAW, bytes(value), len(value)
+
+
+def write(path, store, fields, key):
+    """Write store and search fields to ``path`` (via a temp file and rename)."""
+    sections = [(f"store.{name}", value) for name, value in store.parts().items()]
+    sections += [(f"fields.{name}", value) for name, value in fields.parts().items()]
+    encoded = [(name, *_encode(value)) for name, value in sections]
+
+    offset = HEADER.size + SECTION.size * len(encoded)
+    table, chunks = [], []
+    for name, kind, data, count in encoded:
+        offset += -offset % _ALIGN
+        table.append(SECTION.pack(name.encode(), kind, offset, len(data), count))
+        chunks.append((offset, data))
+        offset += len(data)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, _BYTE_ORDER, key[0], key[1], len(encoded)))
+        f.write(b"".join(table))
+        for offset, data in chunks:
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(data)
+    os.replace(tmp_path, path)
+
+
+def read(path, key=None):
+    """Map a snapshot and return (store, fields) backed by it.
+
+    Arrays are views of the mapping, so nothing is copied but the symbol
+    and term lists. Raises SnapshotError if the file is not a snapshot of
+    this format, or (with ``key``) not of that version of the source DB.
+    """
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    views = []  # released on failure so the mapping can be closed
+    try:
+        if len(mm) < HEADER.size:
+            raise SnapshotError(f"{path} is truncated")
+        magic, version, byte_order, mtime_ns, size, count = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION or byte_order != _BYTE_ORDER:
+            raise SnapshotError(f"{path} is not a version {FORMAT_VERSION} instrument snapshot")
+        if key is not None and (mtime_ns, size) != tuple(key):
+            raise SnapshotError(f"{path} was built from another version of the instrument DB")
+        if HEADER.size + count * SECTION.size > len(mm):
+            raise SnapshotError(f"{path} is truncated")
+
+        view = memoryview(mm)
+        views.append(view)
+        sections = {}
+        for i in range(count):
+            name, kind, offset, length, items = SECTION.unpack_from(mm, HEADER.size + i * SECTION.size)
+            if offset + length > len(mm):
+                raise SnapshotError(f"{path} is truncated")
+            data = view[offset:offset + length]
+            views.append(data)
+            if kind == _TEXT:
+                value = bytes(data).decode().split("\0") if items else []
+            elif kind == _RAW:
+                value = data
+            else:
+                value = data.cast(kind.decode())
+                views.append(value)
+            sections[name.rstrip(b"\0").decode()] = value
+
+        try:
+            store = InstrumentStore(**{name[6:]: value for name, value in sections.items() if name.startswith("store.")})
+            fields = SearchFields(**{name[7:]: value for name, value in sections.items() if name.startswith("fields.")})
+        except TypeError as e:
+            raise SnapshotError(f"{path} is missing sections: {e}")
+    except Exception:
+        for view in reversed(views):
+            view.release()
+        mm.close()
+        raise
+    return store, fields
+
+
+def remove_stale(db_path, keep=None, directory=None):
+    """Delete snapshots of ``db_path`` other than ``keep``; ones still in use are skipped."""
+    pattern = os.path.join(directory or snapshot_dir(db_path), f"{glob.escape(os.path.basename(db_path))}.*.snap")
+    for path in glob.glob(pattern):
+        if keep is None or os.path.abspath(path) != os.path.abspath(keep):
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # still mapped (Windows) or already gone
+
+
+def load_instruments(db_path, directory=None):
+    """Return (store, fields) for the instrument DB, from its snapshot when current.
+
+    A missing or stale snapshot is rebuilt from the DB and written for the
+    next start; if it cannot be written the freshly built index is still used.
+    """
+    key = source_key(db_path)
+    path = snapshot_path(db_path, key, directory)
+    try:
+        return read(path, key)
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Rebuilding instrument snapshot: {e}")
+
+    store = instrument_store.load(db_path)
+    fields = SearchFields.build(store)
+    try:
+        write(path, store, fields, key)
+        remove_stale(db_path, path, directory)
+        print(f"📦 Wrote instrument snapshot {path}")
+    except OSError as e:
+        print(f"⚠️ Could not write instrument snapshot {path}: {e}")
+    return store, fields
+
+
+if __name__ == "__main__":
+    # Build step: python instrument_snapshot.py 20250606DB.db3 [snapshot_dir]
+    if len(sys.argv) < 2:
+        sys.exit("usage: python instrument_snapshot.py INSTRUMENT_DB [SNAPSHOT_DIR]")
+    store, _ = load_instruments(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+    print("Instruments in snapshot:", len(store))
@@ -0,0 +1,211 @@
+import sqlite3
+from array import array
+from bisect import bisect_left, bisect_right
+
+# Optional ResultSet columns carried along with each instrument, by the name
+# they get in payloads. The first column the master actually has is used.
+ENRICHED_FIELDS = {
+    "lot_size": ("LotSize", "Lot_Size", "MarketLot", "BoardLotQuantity", "Lot"),
+    "tick_size": ("TickSize", "Tick_Size"),
+    "expiry": ("Expiry", "ExpiryDate", "Expiry_Date"),
+    "strike": ("Strike", "StrikePrice", "Strike_Price"),
+    "option_type": ("OptionType", "Option_Type"),
+    "instrument_type": ("InstrumentType", "Instrument_Type"),
+    "exchange_segment": ("ExchangeSegment", "Exchange_Segment", "Segment", "Exchange"),
+}
+# Enriched fields handed out as numbers; values are stored as text either way
+NUMERIC_FIELDS = {
+    "lot_size": lambda value: int(float(value)),
+    "tick_size": float,
+    "strike": float,
+}
+
+
+class InstrumentStore:
+    """The instrument master as a few flat arrays instead of a list of tuples.
+
+    Rows are grouped by symbol (master order within a symbol), so a symbol's
+    instruments are one contiguous range of positions. Each symbol string is
+    kept once, names live in one UTF-8 blob indexed by offsets, and tokens
+    in a 64-bit array when they are all numeric (a list of strings otherwise).
+    Tokens are found through a second pair of arrays sorted by token, and
+    (symbol, name) pairs through each symbol's positions sorted by name.
+    Indexing yields the usual (Name, Symbol, Token) tuple, built on demand.
+    Enriched fields (see ENRICHED_FIELDS) are dictionary-encoded: each
+    distinct value is kept once and every instrument holds one code per
+    field. Any sequence works for the arrays, so they can also be views of
+    a snapshot file.
+    """
+
+    def __init__(self, symbols, symbol_starts, name_blob, name_offsets, name_order, tokens, token_keys,
+                 token_positions, extra_fields=(), extra_values=(), extra_codes=()):
+        self.symbols = symbols  # sorted distinct symbols
+        self._symbol_starts = symbol_starts  # len(symbols) + 1 positions
+        self._name_blob = name_blob
+        self._name_offsets = name_offsets  # len(self) + 1 byte offsets
+        self._name_order = name_order  # positions, each symbol's range sorted by name
+        self._tokens = tokens
+        self._token_keys = token_keys  # tokens in sorted order
+        self._token_positions = token_positions  # position of each entry of _token_keys
+        self.extra_fields = list(extra_fields)
+        self._extra_values = extra_values  # distinct enriched values
+        self._extra_codes = extra_codes  # per instrument, one index into _extra_values per field
+
+    @classmethod
+    def from_rows(cls, rows, presorted=False, extra_fields=()):
+        """Build from (Name, Symbol, Token, *extras) rows, one extra value per
+        entry of ``extra_fields``; ``presorted`` if already ordered by symbol."""
+        if not presorted:
+            rows = sorted(rows, key=lambda row: row[1] or "")
+        symbols, symbol_starts = [], array("I")
+        name_blob, name_offsets = bytearray(), array("I", [0])
+        names, tokens = [], []
+        value_codes, extra_values, extra_codes = {}, [], array("I")
+        for name, symbol, token, *extras in rows:
+            symbol = symbol or ""
+            if not symbols or symbols[-1] != symbol:
+                symbols.append(symbol)
+                symbol_starts.append(len(tokens))
+            names.append((name or "").encode())
+            name_blob += names[-1]
+            name_offsets.append(len(name_blob))
+            tokens.append("" if token is None else str(token))
+            for value in extras:
+                value = "" if value is None else str(value)
+                code = value_codes.get(value)
+                if code is None:
+                    code = value_codes[value] = len(extra_values)
+                    extra_values.append(value)
+                extra_codes.append(code)
+        symbol_starts.append(len(tokens))
+        name_order = array("I")
+        for start, end in zip(symbol_starts, symbol_starts[1:]):
+            name_order.extend(sorted(range(start, end), key=names.__getitem__))
+
+        if all(token.isascii() and token.isdigit() and str(int(token)) == token for token in tokens):
+            tokens = array("q", map(int, tokens))
+        order = sorted(range(len(tokens)), key=tokens.__getitem__)
+        token_keys = array("q", (tokens[pos] for pos in order)) if isinstance(tokens, array) \
+            else [tokens[pos] for pos in order]
+        return cls(symbols, symbol_starts, bytes(name_blob), name_offsets, name_order, tokens, token_keys,
+                   array("I", order), extra_fields, extra_values, extra_codes)
+
+    def parts(self):
+        """Constructor arguments by name, e.g. for writing a snapshot."""
+        return {
+            "symbols": self.symbols,
+            "symbol_starts": self._symbol_starts,
+            "name_blob": self._name_blob,
+            "name_offsets": self._name_offsets,
+            "name_order": self._name_order,
+            "tokens": self._tokens,
+            "token_keys": self._token_keys,
+            "token_positions": self._token_positions,
+            "extra_fields": self.extra_fields,
+            "extra_values": list(self._extra_values),
+            "extra_codes": self._extra_codes,
+        }
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def __getitem__(self, pos):
+        return self.name(pos), self.symbol(pos), self.token(pos)
+
+    def __iter__(self):
+        for i, symbol in enumerate(self.symbols):
+            for pos in range(self._symbol_starts[i], self._symbol_starts[i + 1]):
+                yield self.name(pos), symbol, self.token(pos)
+
+    def name(self, pos):
+        return self._name_bytes(pos).decode()
+
+    def _name_bytes(self, pos):
+        return bytes(self._name_blob[self._name_offsets[pos]:self._name_offsets[pos + 1]])
+
+    def symbol(self, pos):
+        return self.symbols[bisect_right(self._symbol_starts, pos) - 1]
+
+    def token(self, pos):
+        return str(self._tokens[pos])
+
+    def details(self, pos):
+        """Enriched fields of an instrument, {field: value} for the fields the master has.
+        NUMERIC_FIELDS come back as numbers, and are left out when blank."""
+        base = pos * len(self.extra_fields)
+        found = {}
+        for i, field in enumerate(self.extra_fields):
+            value = self._extra_values[self._extra_codes[base + i]]
+            convert = NUMERIC_FIELDS.get(field)
+            if convert is not None:
+                try:
+                    value = convert(value)
+                except ValueError:
+                    continue
+            found[field] = value
+        return found
+
+    def symbol_range(self, symbol):
+        """Positions of a symbol's instruments (empty if the symbol is unknown)."""
+        i = bisect_left(self.symbols, symbol)
+        if i == len(self.symbols) or self.symbols[i] != symbol:
+            return range(0)
+        return range(self._symbol_starts[i], self._symbol_starts[i + 1])
+
+    def find_name(self, symbol, name):
+        """Position of the instrument with ``symbol`` and ``name``, or None."""
+        found, key = self.symbol_range(symbol), name.encode()
+        lo, hi = found.start, found.stop
+        while lo < hi:  # bisect over the symbol's positions in name order
+            mid = (lo + hi) // 2
+            if self._name_bytes(self._name_order[mid]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < found.stop and self._name_bytes(self._name_order[lo]) == key:
+            return self._name_order[lo]
+        return None
+
+    def find_token(self, token):
+        """Position of the instrument with ``token``, or None."""
+        key = str(token).strip()
+        if not isinstance(self._token_keys, list):  # numeric tokens
+            if not (key.isascii() and key.isdigit()):
+                return None
+            key = int(key)
+        i = bisect_left(self._token_keys, key)
+        if i < len(self._token_keys) and self._token_keys[i] == key:
+            return self._token_positions[i]
+        return None
+
+
+def enriched_columns(conn):
+    """{field: ResultSet column} for the ENRICHED_FIELDS this master has."""
+    columns = {row[1].lower(): row[1] for row in conn.execute("PRAGMA table_info(ResultSet)")}
+    found = {}
+    for field, candidates in ENRICHED_FIELDS.items():
+        column = next((columns[c.lower()] for c in candidates if c.lower() in columns), None)
+        if column is not None:
+            found[field] = column
+    return found
+
+
+def load(db_path):
+    """Read the instrument master (table ResultSet) into an InstrumentStore.
+
+    Rows are streamed from SQLite already ordered by symbol, keeping each
+    symbol's instruments in the order they first appear in the master.
+    Whichever enriched columns the table has come along in the same query.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        extras = enriched_columns(conn)
+        extra_selects = "".join(f', MIN("{column}")' for column in extras.values())
+        cur = conn.execute(f"""
+            SELECT Name, Symbol, Token{extra_selects} FROM ResultSet
+            GROUP BY Name, Symbol, Token
+            ORDER BY Symbol, MIN(rowid)
+        """)
+        return InstrumentStore.from_rows(cur, presorted=True, extra_fields=list(extras))
+    finally:
+        conn.close()
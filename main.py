@@ -1,7 +1,6 @@
 from db_handler import init_db
 import ui_login
-import sqlite3
-import config  # import the module, not just the variable
+import instrument_master
 import sys
 import os
 
@@ -14,15 +13,10 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 def preload_instruments():
-    db_path = resource_path("20250606DB.db3")
-    conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
-    cur.execute("SELECT DISTINCT Name, Symbol, Token FROM ResultSet")
-    config.cached_instruments = cur.fetchall()
-    print("Loaded instruments:", len(config.cached_instruments))
-    conn.close()
+    # Runs once the login window is up. The instrument master loads, and later
+    # reloads whenever a newer daily DB appears, off the UI thread
+    instrument_master.start(fallback_path=resource_path("20250606DB.db3"))
 
 if __name__ == "__main__":
     init_db()
-    preload_instruments()  # Load instruments once
-    ui_login.login_window()
\ No newline at end of file
+    ui_login.login_window(on_shown=preload_instruments)
@@ -0,0 +1,192 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from strategy_registry import AtomicCounter
+
+_SUB_BUCKET_BITS = 5
+_SUB_BUCKETS = 1 << _SUB_BUCKET_BITS  # ~3% relative error per bucket
+
+
+class LatencyHistogram:
+    """HDR-style log-linear histogram of latencies, recorded in microseconds.
+
+    Values keep their top 6 significant bits, so each bucket spans a few
+    percent of its value at any magnitude and memory stays at a few hundred
+    counters no matter how many samples are recorded.
+    """
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+
+    @staticmethod
+    def _index(value):
+        shift = max(0, value.bit_length() - _SUB_BUCKET_BITS - 1)
+        return shift * _SUB_BUCKETS + (value >> shift)
+
+    @staticmethod
+    def _upper_bound(index):
+        shift = max(0, index // _SUB_BUCKETS - 1)
+        return ((index - shift * _SUB_BUCKETS + 1) << shift) - 1
+
+    def record(self, seconds):
+        value = max(0, int(seconds * 1_000_000))
+        index = self._index(value)
+        with self._lock:
+            self._counts[index] = self._counts.get(index, 0) + 1
+            self.count += 1
+            self.total_us += value
+            if value > self.max_us:
+                self.max_us = value
+
+    def percentile(self, percent):
+        """Upper bound (in seconds) of the bucket holding the given percentile."""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            target = max(1, round(self.count * percent / 100.0))
+            seen = 0
+            for index in sorted(self._counts):
+                seen += self._counts[index]
+                if seen >= target:
+                    return min(self._upper_bound(index), self.max_us) / 1_000_000
+            return self.max_us / 1_000_000
+
+
+class ServerMetrics:
+    """Request, latency and traffic counters for the strategy server."""
+
+    QUANTILES = (50, 95, 99)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}  # action -> AtomicCounter
+        self.errors = {}  # action -> AtomicCounter
+        self.latency = {}  # action -> LatencyHistogram
+        self.inflight = AtomicCounter()
+        self.open_connections = AtomicCounter()
+        self.rejected_connections = AtomicCounter()  # turned away at the connection limit
+        self.bytes_in = AtomicCounter()
+        self.bytes_out = AtomicCounter()
+        self.started = time.time()
+
+    def _for_action(self, action):
+        counter = self.requests.get(action)
+        if counter is None:
+            with self._lock:
+                if action not in self.requests:
+                    self.errors[action] = AtomicCounter()
+                    self.latency[action] = LatencyHistogram()
+                    self.requests[action] = AtomicCounter()
+                counter = self.requests[action]
+        return counter
+
+    def request_started(self, action):
+        self._for_action(action).increment()
+        self.inflight.increment()
+        return time.perf_counter()
+
+    def request_finished(self, action, started, error=False):
+        self.inflight.decrement()
+        self.latency[action].record(time.perf_counter() - started)
+        if error:
+            self.errors[action].increment()
+
+    def request_failed(self, action):
+        # Requests that never reached a handler (e.g. undecodable frames)
+        self._for_action(action).increment()
+        self.errors[action].increment()
+
+    def connection_rejected(self):
+        # Not a request: kept out of the request and error totals
+        self.rejected_connections.increment()
+
+    def _actions(self):
+        with self._lock:
+            return sorted(self.requests)
+
+    def snapshot(self, extra=None):
+        actions = {}
+        for action in self._actions():
+            histogram = self.latency[action]
+            stats = {
+                "count": self.requests[action].value,
+                "errors": self.errors[action].value,
+                "max_ms": round(histogram.max_us / 1000, 3),
+            }
+            for q in self.QUANTILES:
+                stats[f"p{q}_ms"] = round(histogram.percentile(q) * 1000, 3)
+            actions[action] = stats
+        snapshot = {
+            "uptime_s": round(time.time() - self.started, 1),
+            "inflight": self.inflight.value,
+            "open_connections": self.open_connections.value,
+            "rejected_connections": self.rejected_connections.value,
+            "bytes_in": self.bytes_in.value,
+            "bytes_out": self.bytes_out.value,
+            "actions": actions,
+        }
+        snapshot.update(extra or {})
+        return snapshot
+
+    def prometheus_text(self, extra=None):
+        actions = self._actions()
+        lines = [
+            "# TYPE strategy_server_requests_total counter",
+            *(f'strategy_server_requests_total{{action="{a}"}} {self.requests[a].value}' for a in actions),
+            "# TYPE strategy_server_request_errors_total counter",
+            *(f'strategy_server_request_errors_total{{action="{a}"}} {self.errors[a].value}' for a in actions),
+            "# TYPE strategy_server_request_latency_seconds summary",
+        ]
+        for action in actions:
+            histogram = self.latency[action]
+            for q in self.QUANTILES:
+                lines.append(f'strategy_server_request_latency_seconds{{action="{action}",quantile="{q / 100}"}} '
+                             f'{histogram.percentile(q):.6f}')
+            lines.append(f'strategy_server_request_latency_seconds_sum{{action="{action}"}} {histogram.total_us / 1_000_000:.6f}')
+            lines.append(f'strategy_server_request_latency_seconds_count{{action="{action}"}} {histogram.count}')
+        gauges = {
+            "inflight_requests": self.inflight.value,
+            "open_connections": self.open_connections.value,
+        }
+        gauges.update(extra or {})
+        for name, value in gauges.items():
+            lines += [f"# TYPE strategy_server_{name} gauge", f"strategy_server_{name} {value}"]
+        lines += [
+            "# TYPE strategy_server_connections_rejected_total counter",
+            f"strategy_server_connections_rejected_total {self.rejected_connections.value}",
+            "# TYPE strategy_server_bytes_received_total counter",
+            f"strategy_server_bytes_received_total {self.bytes_in.value}",
+            "# TYPE strategy_server_bytes_sent_total counter",
+            f"strategy_server_bytes_sent_total {self.bytes_out.value}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def start_metrics_http_server(render, host="127.0.0.1", port=9100):
+    """Serve ``render()`` as Prometheus text on http://host:port/metrics from a daemon thread."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    httpd = ThreadingHTTPServer((host, port), MetricsHandler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True, name="metrics-http").start()
+    print(f"📊 Metrics available on http://{host}:{port}/metrics")
+    return httpd
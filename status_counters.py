@@ -0,0 +1,96 @@
+import threading
+
+import db_handler
+import strategy_store
+
+
+class _TableCounts:
+    __slots__ = ("active_ids", "total")
+
+    def __init__(self, active_ids, total):
+        self.active_ids = active_ids
+        self.total = total
+
+
+class StatusCounters:
+    """Active/total strategy counts per table, kept in memory.
+
+    A table is seeded once from the status index (cost proportional to its
+    active rows, not its size); after that every status transition, added
+    row and deleted row adjusts the counts in O(1), so reading them never
+    touches SQLite. Only the ids of ACTIVE rows are held, which is also what
+    makes repeated transitions of the same row idempotent.
+    """
+
+    def __init__(self):
+        self._tables = {}  # TableRef -> _TableCounts
+        self._lock = threading.Lock()
+
+    def _counts(self, table):
+        return self._seed(table)[0]
+
+    def _seed(self, table):
+        """(counts, seeded): ``seeded`` is True when this call read them from the DB."""
+        counts = self._tables.get(table)
+        if counts is not None:
+            return counts, False
+        db_handler.status_writes.flush()  # seed from what callbacks already decided
+        conn = db_handler.connect()
+        try:
+            active_ids = {str(row_id) for row_id in strategy_store.active_row_ids(conn, table)}
+            _, total = strategy_store.status_counts(conn, table)
+        finally:
+            conn.close()
+        seeded = _TableCounts(active_ids, total)
+        with self._lock:
+            counts = self._tables.setdefault(table, seeded)
+        return counts, counts is seeded
+
+    def get(self, table):
+        """Return (active, total) for a table."""
+        counts = self._counts(table)
+        with self._lock:
+            return len(counts.active_ids), counts.total
+
+    def set_status(self, table, row_id, status):
+        counts = self._counts(table)
+        with self._lock:
+            if str(status).upper() == "ACTIVE":
+                counts.active_ids.add(str(row_id))
+            else:
+                counts.active_ids.discard(str(row_id))
+
+    # rows_added/row_removed run once the change is committed: counts seeded
+    # by the same call have already read it from the DB
+
+    def row_added(self, table, row_id, status="INACTIVE"):
+        self.rows_added(table, [row_id], status)
+
+    def rows_added(self, table, row_ids, status="INACTIVE"):
+        counts, seeded = self._seed(table)
+        if seeded:
+            return
+        with self._lock:
+            counts.total += len(row_ids)
+            if str(status).upper() == "ACTIVE":
+                counts.active_ids.update(map(str, row_ids))
+
+    def row_removed(self, table, row_id):
+        counts, seeded = self._seed(table)
+        if seeded:
+            return
+        with self._lock:
+            counts.total = max(0, counts.total - 1)
+            counts.active_ids.discard(str(row_id))
+
+    def forget(self, table):
+        """Drop a table's counts; the next read seeds them again."""
+        with self._lock:
+            self._tables.pop(table, None)
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+
+
+counters = StatusCounters()
@@ -0,0 +1,87 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DelayScheduler:
+    """Single timer thread that runs callbacks after a delay.
+
+    Used instead of time.sleep so a delayed job does not hold a worker (or a
+    connection thread) while it waits.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._running = True
+        threading.Thread(target=self._run, daemon=True, name="job-delay").start()
+
+    def call_later(self, delay, fn, *args):
+        with self._cond:
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._seq), fn, args))
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._heap:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                due = self._heap[0][0] - time.monotonic()
+                if due > 0:
+                    self._cond.wait(due)
+                    continue
+                _, _, fn, args = heapq.heappop(self._heap)
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"❌ Delayed job error: {e}")
+
+
+class StrategyExecutor:
+    """Runs strategy jobs off the request path.
+
+    ``submit(job, data, on_done)`` must return immediately and later call
+    ``on_done(result)`` exactly once from any thread. Subclass it to plug a
+    real strategy engine into the server.
+    """
+
+    def submit(self, job, data, on_done):
+        raise NotImplementedError
+
+    def shutdown(self):
+        pass
+
+
+class SimulatedStrategyExecutor(StrategyExecutor):
+    """Runs jobs on a worker pool and reports completion after ``latency`` seconds."""
+
+    def __init__(self, latency=0.1, workers=8):
+        self.latency = latency
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="strategy-job")
+        self.scheduler = DelayScheduler()
+
+    def submit(self, job, data, on_done):
+        def run():
+            try:
+                result = job(data)
+            except Exception as e:
+                result = {"status": "error", "message": str(e)}
+            if self.latency > 0:
+                self.scheduler.call_later(self.latency, self.pool.submit, on_done, result)
+            else:
+                on_done(result)
+        self.pool.submit(run)
+
+    def shutdown(self):
+        self.scheduler.stop()
+        self.pool.shutdown(wait=False)
@@ -0,0 +1,136 @@
+import threading
+from datetime import datetime
+
+
+class AtomicCounter:
+    """Integer counter that is safe to bump from many threads."""
+
+    def __init__(self, value=0):
+        self._value = value
+        self._lock = threading.Lock()
+
+    def increment(self, amount=1):
+        with self._lock:
+            self._value += amount
+            return self._value
+
+    def decrement(self, amount=1):
+        return self.increment(-amount)
+
+    @property
+    def value(self):
+        return self._value
+
+
+class _Shard:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.by_workspace = {}  # (user_id, workspace_id) -> {strategy_id: entry}
+        self.by_table_type = {}  # table_type -> set of keys
+        self.by_token = {}  # instrument token -> set of keys
+
+
+def _norm(value):
+    return "" if value is None else str(value)
+
+
+def _index_add(index, name, key):
+    index.setdefault(name, set()).add(key)
+
+
+def _index_remove(index, name, key):
+    keys = index.get(name)
+    if keys is not None:
+        keys.discard(key)
+        if not keys:
+            del index[name]
+
+
+class StrategyRegistry:
+    """Active strategies, sharded by (user_id, workspace_id).
+
+    Each shard has its own lock plus secondary indexes by table_type and
+    instrument token, so workspace lookups touch one shard and table/token
+    lookups touch one index bucket per shard instead of every strategy.
+    Keys are (user_id, workspace_id, strategy_id) with ids compared as strings.
+    """
+
+    def __init__(self, shard_count=16):
+        self._shards = [_Shard() for _ in range(shard_count)]
+        self._size = AtomicCounter()
+
+    def _shard(self, user_id, workspace_id):
+        return self._shards[hash((user_id, workspace_id)) % len(self._shards)]
+
+    def add(self, user_id, workspace_id, strategy_id, data, table_type="", token=""):
+        user_id, workspace_id = _norm(user_id), _norm(workspace_id)
+        table_type, token = _norm(table_type), _norm(token)
+        key = (user_id, workspace_id, strategy_id)
+        entry = {
+            'user_id': user_id,
+            'workspace_id': workspace_id,
+            'strategy_id': strategy_id,
+            'table_type': table_type,
+            'token': token,
+            'start_time': datetime.now().isoformat(),
+            'complete_data': data
+        }
+        shard = self._shard(user_id, workspace_id)
+        with shard.lock:
+            strategies = shard.by_workspace.setdefault((user_id, workspace_id), {})
+            previous = strategies.get(strategy_id)
+            if previous is not None:
+                # Re-applying replaces the entry; its index keys may have moved
+                _index_remove(shard.by_table_type, previous['table_type'], key)
+                _index_remove(shard.by_token, previous['token'], key)
+            else:
+                self._size.increment()
+            strategies[strategy_id] = entry
+            _index_add(shard.by_table_type, table_type, key)
+            _index_add(shard.by_token, token, key)
+        return entry
+
+    def remove(self, user_id, workspace_id, strategy_id):
+        user_id, workspace_id = _norm(user_id), _norm(workspace_id)
+        key = (user_id, workspace_id, strategy_id)
+        shard = self._shard(user_id, workspace_id)
+        with shard.lock:
+            strategies = shard.by_workspace.get((user_id, workspace_id))
+            if not strategies or strategy_id not in strategies:
+                return None
+            entry = strategies.pop(strategy_id)
+            if not strategies:
+                del shard.by_workspace[(user_id, workspace_id)]
+            _index_remove(shard.by_table_type, entry['table_type'], key)
+            _index_remove(shard.by_token, entry['token'], key)
+        self._size.decrement()
+        return entry
+
+    def get(self, user_id, workspace_id, strategy_id):
+        user_id, workspace_id = _norm(user_id), _norm(workspace_id)
+        shard = self._shard(user_id, workspace_id)
+        with shard.lock:
+            return shard.by_workspace.get((user_id, workspace_id), {}).get(strategy_id)
+
+    def for_workspace(self, user_id, workspace_id):
+        user_id, workspace_id = _norm(user_id), _norm(workspace_id)
+        shard = self._shard(user_id, workspace_id)
+        with shard.lock:
+            return list(shard.by_workspace.get((user_id, workspace_id), {}).values())
+
+    def for_table_type(self, table_type):
+        return self._lookup('by_table_type', _norm(table_type))
+
+    def for_token(self, token):
+        return self._lookup('by_token', _norm(token))
+
+    def _lookup(self, index_name, value):
+        found = []
+        for shard in self._shards:
+            with shard.lock:
+                for user_id, workspace_id, strategy_id in getattr(shard, index_name).get(value, ()):
+                    found.append(shard.by_workspace[(user_id, workspace_id)][strategy_id])
+        return found
+
+    def __len__(self):
+        return self._size.value
@@ -0,0 +1,714 @@
+import json
+import sqlite3
+import threading
+from collections import deque
+
+import config
+
+STORAGE_PHYSICAL = "physical"  # one SQLite table per strategy group (user_{uid}_ws_{wid}_{NAME})
+STORAGE_CONSOLIDATED = "consolidated"  # every group's rows in the shared strategy_rows table
+
+# Columns every strategy table starts with, in display order, and where the
+# consolidated layout keeps them. User-defined columns follow, per the schema.
+SYSTEM_COLUMNS = [
+    ("ID", "row_id"),
+    ("STRATEGY", "strategy"),
+    ("TABLE", "table_type"),
+    ("STATUS", "status"),
+    ("InstrumentToken", "instrument_token"),
+    ("InstrumentID", "instrument_id"),
+    ("InstrumentName", "instrument_name"),
+]
+_SYSTEM_BY_UPPER = {name.upper(): field for name, field in SYSTEM_COLUMNS}
+
+
+def create_validator(data_type):
+    """Tk validatecommand for a cell of the given schema type."""
+    def validate(P):
+        if data_type == "INTEGER":
+            return P == "" or P.isdigit()
+        elif data_type == "FLOAT":
+            try:
+                float(P)
+                return True
+            except ValueError:
+                return P == ""  # Allow empty
+        return True  # TEXT allows anything
+    return validate
+
+
+class TableRef:
+    """One row of user_tables: which strategy group, its schema and where its rows live.
+
+    Everything the views need about the schema is worked out once here:
+    editable columns, column types and defaults and the cell validators.
+    The actual column order is filled in by ``column_names`` on first use.
+    """
+
+    __slots__ = ("table_id", "user_id", "workspace_id", "table_name", "schema", "physical_name", "storage",
+                 "editable", "column_types", "defaults", "validators", "columns", "col_index")
+
+    def __init__(self, table_id, user_id, workspace_id, table_name, schema, physical_name, storage):
+        self.table_id = table_id
+        self.user_id = user_id
+        self.workspace_id = workspace_id
+        self.table_name = table_name
+        self.schema = schema
+        self.physical_name = physical_name
+        self.storage = storage or STORAGE_PHYSICAL
+        self.editable = frozenset(col["name"] for col in schema if col.get("editable"))
+        self.column_types = {col["name"]: col.get("type") for col in schema}
+        # Columns added to the schema after a row was written read as their default
+        self.defaults = [(col["name"], _coerce(col.get("default"), col.get("type"))) for col in schema]
+        self.validators = {col["name"]: create_validator(col.get("type")) for col in schema if col.get("editable")}
+        self.columns = None
+        self.col_index = None
+
+    # Hashable on the user_tables id so buffers can group writes per table
+    def __eq__(self, other):
+        return isinstance(other, TableRef) and other.table_id == self.table_id
+
+    def __hash__(self):
+        return hash(self.table_id)
+
+    def __repr__(self):
+        return f"TableRef({self.table_id}, {self.table_name!r}, {self.storage})"
+
+
+class TableCache:
+    """TableRefs keyed by (user_id, workspace_id, table_name).
+
+    A strategy group's schema only changes through Edit Table or Delete, so
+    once a group has been looked up its parsed schema, validators and column
+    map are reused without another user_tables query or JSON parse. Callers
+    that rename, re-schema or delete a group must call ``invalidate``.
+    """
+
+    def __init__(self):
+        self._refs = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(user_id, workspace_id, table_name):
+        return str(user_id), str(workspace_id), table_name
+
+    def get(self, user_id, workspace_id, table_name):
+        with self._lock:
+            return self._refs.get(self.key(user_id, workspace_id, table_name))
+
+    def put(self, ref):
+        with self._lock:
+            self._refs[self.key(ref.user_id, ref.workspace_id, ref.table_name)] = ref
+
+    def invalidate(self, user_id, workspace_id, table_name=None):
+        """Forget one group, or every group of a workspace when table_name is None."""
+        with self._lock:
+            if table_name is not None:
+                self._refs.pop(self.key(user_id, workspace_id, table_name), None)
+                return
+            workspace = (str(user_id), str(workspace_id))
+            for key in [k for k in self._refs if k[:2] == workspace]:
+                del self._refs[key]
+
+    def clear(self):
+        with self._lock:
+            self._refs.clear()
+
+
+tables = TableCache()
+
+
+_ID_CHUNK = 500  # ids per IN (...) list, well under SQLite's bound-parameter limit
+
+
+def _chunks(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), _ID_CHUNK):
+        yield ids[start:start + _ID_CHUNK]
+
+
+_REF_COLUMNS = "id, user_id, workspace_id, table_name, schema, physical_table_name, storage"
+
+
+def _ref_from_row(row):
+    table_id, user_id, workspace_id, table_name, schema, physical_name, storage = row
+    return TableRef(table_id, user_id, workspace_id, table_name,
+                    json.loads(schema) if schema else [], physical_name, storage)
+
+
+def _connect():
+    import db_handler  # imported here: db_handler imports this module
+    return db_handler.connect()
+
+
+def lookup(conn, user_id, workspace_id, table_name):
+    """Return the TableRef for a strategy group, or None if it does not exist.
+
+    Served from the table cache when possible; ``conn`` may be None, in
+    which case a pooled connection is only checked out on a cache miss.
+    """
+    ref = tables.get(user_id, workspace_id, table_name)
+    if ref is not None:
+        return ref
+    own = conn is None
+    if own:
+        conn = _connect()
+    try:
+        row = conn.execute(f"SELECT {_REF_COLUMNS} FROM user_tables WHERE user_id=? AND workspace_id=? AND table_name=?",
+                           (user_id, workspace_id, table_name)).fetchone()
+    finally:
+        if own:
+            conn.close()
+    if row is None:
+        return None
+    ref = _ref_from_row(row)
+    tables.put(ref)
+    return ref
+
+
+def invalidate(user_id, workspace_id, table_name=None):
+    """Drop cached metadata after a group is renamed, re-schemed or deleted."""
+    tables.invalidate(user_id, workspace_id, table_name)
+
+
+def column_names(conn, ref):
+    """Column names of a group in row order, read once and kept on the ref.
+
+    Physical tables are asked directly, since their real columns can differ
+    from the schema. Sets ``ref.col_index`` alongside.
+    """
+    if ref.columns is None:
+        own = conn is None
+        if own:
+            conn = _connect()
+        try:
+            columns, _ = store_for(ref).fetch_page(conn, ref, None, 0)
+        finally:
+            if own:
+                conn.close()
+        ref.col_index = {name: idx for idx, name in enumerate(columns)}
+        ref.columns = columns
+    return ref.columns
+
+
+def tables_for_workspace(conn, user_id, workspace_id):
+    rows = conn.execute(f"SELECT {_REF_COLUMNS} FROM user_tables WHERE user_id=? AND workspace_id=? ORDER BY id",
+                        (user_id, workspace_id)).fetchall()
+    refs = []
+    for row in rows:
+        ref = tables.get(user_id, workspace_id, row[3])
+        if ref is None or ref.table_id != row[0]:
+            ref = _ref_from_row(row)
+            tables.put(ref)
+        refs.append(ref)
+    return refs
+
+
+def physical_table_name(user_id, workspace_id, table_name):
+    return f"user_{user_id}_ws_{workspace_id}_{table_name}".replace(" ", "_")
+
+
+def _coerce(value, col_type):
+    """Mimic SQLite column affinity for values kept outside a typed column."""
+    if value is None or not isinstance(value, str) or col_type not in ("INTEGER", "FLOAT"):
+        return value
+    try:
+        number = float(value) if col_type == "FLOAT" else int(value)
+    except ValueError:
+        try:
+            number = float(value)
+        except ValueError:
+            return value
+    return number
+
+
+def _create_active_index(conn, physical_name):
+    # Partial index: only ACTIVE rows are indexed, so it stays small and
+    # active counts never scan the table
+    conn.execute(f'CREATE INDEX IF NOT EXISTS "{physical_name}_active" ON {physical_name} (ID) WHERE STATUS = \'ACTIVE\'')
+
+
+class PhysicalTableStore:
+    """Original layout: a dedicated table per strategy group. ID is the
+    table's INTEGER PRIMARY KEY, so per-row updates are rowid lookups."""
+
+    def create(self, conn, ref):
+        column_defs = ['"ID" INTEGER PRIMARY KEY', '"STRATEGY" TEXT', '"TABLE" TEXT', '"STATUS" TEXT', '"InstrumentToken" TEXT', '"InstrumentID" TEXT', '"InstrumentName" TEXT']
+        for col in ref.schema:
+            column_defs.append(f'"{col["name"]}" {col["type"]}')
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {ref.physical_name} ({', '.join(column_defs)})")
+        _create_active_index(conn, ref.physical_name)
+
+    def drop(self, conn, ref):
+        # Rows have always been left in place when a group is deleted
+        pass
+
+    def fetch_rows(self, conn, ref, row_ids=None):
+        if row_ids is None:
+            cur = conn.execute(f"SELECT * FROM {ref.physical_name}")
+            rows = cur.fetchall()
+            return [desc[0] for desc in cur.description], rows
+        cur = conn.execute(f"SELECT * FROM {ref.physical_name} LIMIT 0")
+        col_names, rows = [desc[0] for desc in cur.description], []
+        for chunk in _chunks(row_ids):
+            rows += conn.execute(f"SELECT * FROM {ref.physical_name} WHERE ID IN ({','.join('?' * len(chunk))})",
+                                 chunk).fetchall()
+        return col_names, rows
+
+    def fetch_page(self, conn, ref, after_id, limit):
+        if after_id is None:
+            cur = conn.execute(f"SELECT * FROM {ref.physical_name} ORDER BY ID LIMIT ?", (limit,))
+        else:
+            cur = conn.execute(f"SELECT * FROM {ref.physical_name} WHERE ID > ? ORDER BY ID LIMIT ?", (after_id, limit))
+        rows = cur.fetchall()
+        return [desc[0] for desc in cur.description], rows
+
+    def insert_rows(self, conn, ref, rows):
+        if not rows:
+            return
+        columns = list(rows[0].keys())
+        quoted_columns = ', '.join(f'"{col}"' for col in columns)
+        placeholders = ",".join("?" for _ in columns)
+        conn.executemany(f"INSERT INTO {ref.physical_name} ({quoted_columns}) VALUES ({placeholders})",
+                         [[row[col] for col in columns] for row in rows])
+
+    def update_field(self, conn, ref, row_id, col, value):
+        conn.execute(f'UPDATE {ref.physical_name} SET "{col}" = ? WHERE ID = ?', (value, row_id))
+
+    def set_statuses(self, conn, ref, params):
+        conn.executemany(f"UPDATE {ref.physical_name} SET STATUS = ? WHERE ID = ?", params)
+
+    def delete_row(self, conn, ref, row_id):
+        conn.execute(f'DELETE FROM {ref.physical_name} WHERE ID = ?', (row_id,))
+
+    def status_counts(self, conn, ref):
+        total = conn.execute(f"SELECT COUNT(*) FROM {ref.physical_name}").fetchone()[0]
+        active = conn.execute(f"SELECT COUNT(*) FROM {ref.physical_name} WHERE STATUS = 'ACTIVE'").fetchone()[0]
+        return active, total
+
+    def active_row_ids(self, conn, ref):
+        return [row[0] for row in conn.execute(f"SELECT ID FROM {ref.physical_name} WHERE STATUS = 'ACTIVE'")]
+
+    def renumber(self, conn, ref, next_id):
+        rowids = [row[0] for row in conn.execute(f"SELECT rowid FROM {ref.physical_name} ORDER BY rowid")]
+        # Park every row on its negated rowid first: unique even if IDs were
+        # duplicated, and new ids never collide with the primary key
+        conn.execute(f"UPDATE {ref.physical_name} SET ID = -rowid")
+        conn.executemany(f"UPDATE {ref.physical_name} SET ID = ? WHERE ID = ?",
+                         [(new_id, -rowid) for new_id, rowid in enumerate(rowids, start=next_id)])
+        return next_id + len(rowids)
+
+
+class ConsolidatedStore:
+    """All strategy rows in one strategy_rows table keyed by
+    (user_id, workspace_id, table_id, row_id). The fixed columns are real
+    columns; user-defined columns live in a JSON object in ``fields``.
+    Rows come back shaped exactly like ``SELECT *`` on a physical table.
+    """
+
+    def _key(self, ref, row_id):
+        return (ref.user_id, ref.workspace_id, ref.table_id, int(row_id))
+
+    def create(self, conn, ref):
+        pass  # nothing to create per group
+
+    def drop(self, conn, ref):
+        conn.execute("DELETE FROM strategy_rows WHERE user_id=? AND workspace_id=? AND table_id=?",
+                     (ref.user_id, ref.workspace_id, ref.table_id))
+
+    _SELECT = """
+        SELECT CAST(row_id AS TEXT), strategy, table_type, status, instrument_token, instrument_id,
+               instrument_name, fields
+        FROM strategy_rows
+        WHERE user_id=? AND workspace_id=? AND table_id=?
+    """
+
+    def fetch_rows(self, conn, ref, row_ids=None):
+        group = (ref.user_id, ref.workspace_id, ref.table_id)
+        if row_ids is None:
+            cursors = [conn.execute(self._SELECT + " ORDER BY row_id", group)]
+        else:
+            cursors = (conn.execute(self._SELECT + f" AND row_id IN ({','.join('?' * len(chunk))})",
+                                    (*group, *(int(row_id) for row_id in chunk)))
+                       for chunk in _chunks(row_ids))
+        return self._decode(ref, cursors)
+
+    def fetch_page(self, conn, ref, after_id, limit):
+        group = (ref.user_id, ref.workspace_id, ref.table_id)
+        after = -2 ** 63 if after_id is None else int(after_id)
+        return self._decode(ref, [conn.execute(self._SELECT + " AND row_id > ? ORDER BY row_id LIMIT ?",
+                                               (*group, after, limit))])
+
+    def _decode(self, ref, cursors):
+        user_columns = ref.defaults
+        rows = []
+        for cur in cursors:
+            for *fixed, fields in cur:
+                extra = json.loads(fields) if fields else {}
+                rows.append(tuple(fixed) + tuple(extra.get(name, default) for name, default in user_columns))
+        return [name for name, _ in SYSTEM_COLUMNS] + [name for name, _ in user_columns], rows
+
+    def _split(self, ref, row):
+        fixed = {field: None for _, field in SYSTEM_COLUMNS}
+        fixed["status"] = "INACTIVE"
+        types = ref.column_types
+        extra = {}
+        for col, value in row.items():
+            field = _SYSTEM_BY_UPPER.get(col.upper())
+            if field:
+                fixed[field] = value
+            else:
+                extra[col] = _coerce(value, types.get(col))
+        fixed["status"] = str(fixed["status"]).upper()
+        return fixed, extra
+
+    def insert_rows(self, conn, ref, rows):
+        params = []
+        for row in rows:
+            fixed, extra = self._split(ref, row)
+            params.append((ref.user_id, ref.workspace_id, ref.table_id, int(fixed["row_id"]),
+                           fixed["strategy"], fixed["table_type"], fixed["status"], fixed["instrument_token"],
+                           fixed["instrument_id"], fixed["instrument_name"], json.dumps(extra)))
+        conn.executemany("""
+            INSERT INTO strategy_rows (user_id, workspace_id, table_id, row_id, strategy, table_type, status,
+                                       instrument_token, instrument_id, instrument_name, fields)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, params)
+
+    def update_field(self, conn, ref, row_id, col, value):
+        field = _SYSTEM_BY_UPPER.get(col.upper())
+        key = self._key(ref, row_id)
+        if field:
+            conn.execute(f"UPDATE strategy_rows SET {field} = ? "
+                         f"WHERE user_id=? AND workspace_id=? AND table_id=? AND row_id=?", (value, *key))
+            return
+        col_type = ref.column_types.get(col)
+        row = conn.execute("SELECT fields FROM strategy_rows WHERE user_id=? AND workspace_id=? AND table_id=? AND row_id=?",
+                           key).fetchone()
+        if row is None:
+            return
+        extra = json.loads(row[0]) if row[0] else {}
+        extra[col] = _coerce(value, col_type)
+        conn.execute("UPDATE strategy_rows SET fields = ? WHERE user_id=? AND workspace_id=? AND table_id=? AND row_id=?",
+                     (json.dumps(extra), *key))
+
+    def set_statuses(self, conn, ref, params):
+        conn.executemany("UPDATE strategy_rows SET status = ? WHERE user_id=? AND workspace_id=? AND table_id=? AND row_id=?",
+                         [(str(status).upper(), *self._key(ref, row_id)) for status, row_id in params])
+
+    def delete_row(self, conn, ref, row_id):
+        conn.execute("DELETE FROM strategy_rows WHERE user_id=? AND workspace_id=? AND table_id=? AND row_id=?",
+                     self._key(ref, row_id))
+
+    def status_counts(self, conn, ref):
+        group = (ref.user_id, ref.workspace_id, ref.table_id)
+        total = conn.execute("SELECT COUNT(*) FROM strategy_rows WHERE user_id=? AND workspace_id=? AND table_id=?",
+                             group).fetchone()[0]
+        active = conn.execute("SELECT COUNT(*) FROM strategy_rows WHERE table_id=? AND status='ACTIVE'",
+                              (ref.table_id,)).fetchone()[0]
+        return active, total
+
+    def active_row_ids(self, conn, ref):
+        return [row[0] for row in conn.execute("SELECT row_id FROM strategy_rows WHERE table_id=? AND status='ACTIVE'",
+                                               (ref.table_id,))]
+
+    def renumber(self, conn, ref, next_id):
+        group = (ref.user_id, ref.workspace_id, ref.table_id)
+        old_ids = [r[0] for r in conn.execute(
+            "SELECT row_id FROM strategy_rows WHERE user_id=? AND workspace_id=? AND table_id=? ORDER BY row_id", group)]
+        # Park the rows on negative ids first so new ids never collide with old ones
+        conn.execute("UPDATE strategy_rows SET row_id = -row_id WHERE user_id=? AND workspace_id=? AND table_id=?", group)
+        conn.executemany("UPDATE strategy_rows SET row_id = ? WHERE user_id=? AND workspace_id=? AND table_id=? AND row_id=?",
+                         [(new_id, *group, -old_id) for new_id, old_id in enumerate(old_ids, start=next_id)])
+        return next_id + len(old_ids)
+
+
+_STORES = {
+    STORAGE_PHYSICAL: PhysicalTableStore(),
+    STORAGE_CONSOLIDATED: ConsolidatedStore(),
+}
+
+
+def store_for(ref):
+    return _STORES[ref.storage]
+
+
+def default_storage():
+    storage = getattr(config, "STRATEGY_STORAGE", STORAGE_CONSOLIDATED)
+    return storage if storage in _STORES else STORAGE_CONSOLIDATED
+
+
+def create_table(conn, user_id, workspace_id, table_name, schema, storage=None):
+    """Register a new strategy group in user_tables and create its storage."""
+    storage = storage or default_storage()
+    physical_name = physical_table_name(user_id, workspace_id, table_name)
+    cur = conn.execute("""
+        INSERT INTO user_tables (user_id, workspace_id, table_name, schema, physical_table_name, is_default, storage)
+        VALUES (?, ?, ?, ?, ?, 0, ?)
+    """, (user_id, workspace_id, table_name, json.dumps(schema), physical_name, storage))
+    ref = TableRef(cur.lastrowid, user_id, workspace_id, table_name, schema, physical_name, storage)
+    store_for(ref).create(conn, ref)
+    tables.put(ref)
+    return ref
+
+
+class ChangeLog:
+    """Per-table version counters plus a bounded log of which rows changed.
+
+    Every write through this module bumps the table's version and records
+    the row ids it touched, so a view that rendered version N can ask for
+    just the rows changed since then. Only writes made by this process are
+    seen. Once a table's log overflows, or its ids are renumbered, older
+    versions can no longer be answered and callers must reload in full.
+    """
+
+    def __init__(self, capacity=10000):
+        self.capacity = capacity
+        self._versions = {}  # table_id -> current version
+        self._floor = {}  # table_id -> oldest version the log can still answer
+        self._log = {}  # table_id -> deque of (version, row_id)
+        self._lock = threading.Lock()
+
+    def version(self, ref):
+        with self._lock:
+            return self._versions.get(ref.table_id, 0)
+
+    def touch(self, ref, row_ids):
+        with self._lock:
+            version = self._versions.get(ref.table_id, 0) + 1
+            self._versions[ref.table_id] = version
+            log = self._log.setdefault(ref.table_id, deque())
+            for row_id in row_ids:
+                log.append((version, str(row_id)))
+            while len(log) > self.capacity:
+                dropped_version, _ = log.popleft()
+                self._floor[ref.table_id] = dropped_version
+            return version
+
+    def invalidate(self, ref):
+        with self._lock:
+            version = self._versions.get(ref.table_id, 0) + 1
+            self._versions[ref.table_id] = version
+            self._floor[ref.table_id] = version
+            self._log.pop(ref.table_id, None)
+            return version
+
+    def changed_since(self, ref, version):
+        """Ids of rows changed after ``version``, or None if a full reload is needed."""
+        with self._lock:
+            if version < self._floor.get(ref.table_id, 0):
+                return None
+            changed = set()
+            for v, row_id in reversed(self._log.get(ref.table_id, ())):
+                if v <= version:
+                    break
+                changed.add(row_id)
+            return changed
+
+
+changes = ChangeLog()
+
+
+def fetch_rows(conn, ref, row_ids=None):
+    """Return (column_names, rows) for a group, shaped like SELECT * on a physical table.
+    With ``row_ids``, only those rows (missing ones are simply absent)."""
+    return store_for(ref).fetch_rows(conn, ref, row_ids)
+
+
+def fetch_page(conn, ref, after_id=None, limit=500):
+    """Keyset page: up to ``limit`` rows with ID greater than ``after_id``, in ID order."""
+    return store_for(ref).fetch_page(conn, ref, after_id, limit)
+
+
+def iter_pages(conn, ref, page_size=500):
+    """Yield (column_names, rows) a page at a time, so only one page is held in memory."""
+    after_id = None
+    while True:
+        col_names, rows = fetch_page(conn, ref, after_id, page_size)
+        if rows:
+            yield col_names, rows
+        if len(rows) < page_size:
+            return
+        after_id = rows[-1][col_names.index("ID")]
+
+
+def insert_rows(conn, ref, rows):
+    """Insert row dicts keyed by column name (system columns match case-insensitively)."""
+    store_for(ref).insert_rows(conn, ref, rows)
+    changes.touch(ref, (next(v for k, v in row.items() if k.upper() == "ID") for row in rows))
+
+
+def update_field(conn, ref, row_id, col, value):
+    store_for(ref).update_field(conn, ref, row_id, col, value)
+    changes.touch(ref, (row_id,))
+
+
+def set_statuses(conn, ref, params):
+    """Apply [(status, row_id), ...] to one group."""
+    store_for(ref).set_statuses(conn, ref, params)
+    changes.touch(ref, (row_id for _, row_id in params))
+
+
+def delete_row(conn, ref, row_id):
+    store_for(ref).delete_row(conn, ref, row_id)
+    changes.touch(ref, (row_id,))
+
+
+def drop_table(conn, ref):
+    store_for(ref).drop(conn, ref)
+    changes.invalidate(ref)
+    tables.invalidate(ref.user_id, ref.workspace_id, ref.table_name)
+
+
+def status_counts(conn, ref):
+    """Return (active, total) for a group."""
+    return store_for(ref).status_counts(conn, ref)
+
+
+def active_row_ids(conn, ref):
+    """IDs of a group's ACTIVE rows, read from the status index."""
+    return store_for(ref).active_row_ids(conn, ref)
+
+
+def renumber(conn, ref, next_id):
+    """Renumber a group's rows from next_id in their current order; returns the next free id."""
+    next_id = store_for(ref).renumber(conn, ref, next_id)
+    changes.invalidate(ref)
+    return next_id
+
+
+def init_storage(conn):
+    """Create the consolidated table and tag pre-existing groups with their layout."""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(user_tables)")]
+    if "storage" not in columns:
+        # Every group created before this column existed has its own table
+        conn.execute(f"ALTER TABLE user_tables ADD COLUMN storage TEXT DEFAULT '{STORAGE_PHYSICAL}'")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS strategy_rows (
+            user_id INTEGER NOT NULL,
+            workspace_id INTEGER NOT NULL,
+            table_id INTEGER NOT NULL,
+            row_id INTEGER NOT NULL,
+            strategy TEXT,
+            table_type TEXT,
+            status TEXT NOT NULL DEFAULT 'INACTIVE',
+            instrument_token TEXT,
+            instrument_id TEXT,
+            instrument_name TEXT,
+            fields TEXT NOT NULL DEFAULT '{}',  -- user-defined columns as a JSON object
+            PRIMARY KEY (user_id, workspace_id, table_id, row_id)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_strategy_rows_status ON strategy_rows (table_id, status)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_strategy_rows_token ON strategy_rows (instrument_token)")
+
+
+def _free_table_name(conn, name):
+    candidate, n = name, 1
+    while conn.execute("SELECT 1 FROM sqlite_master WHERE name=?", (candidate,)).fetchone():
+        n += 1
+        candidate = f"{name}_{n}"
+    return candidate
+
+
+def migrate_physical_tables(conn):
+    """Move every physical-layout group into strategy_rows, one savepoint per group.
+
+    Once its rows are copied the per-group table is kept as a backup,
+    renamed to ``<name>_premigration``. A group whose rows cannot be
+    converted (e.g. a non-numeric ID) is left as it was.
+    Returns the number of groups migrated.
+    """
+    refs = [_ref_from_row(row) for row in conn.execute(
+        f"SELECT {_REF_COLUMNS} FROM user_tables WHERE storage IS NULL OR storage=?", (STORAGE_PHYSICAL,))]
+    migrated = 0
+    for ref in refs:
+        consolidated = TableRef(ref.table_id, ref.user_id, ref.workspace_id, ref.table_name, ref.schema,
+                                ref.physical_name, STORAGE_CONSOLIDATED)
+        conn.execute("SAVEPOINT migrate_group")
+        try:
+            exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+                                  (ref.physical_name,)).fetchone()
+            if exists:
+                col_names, rows = _STORES[STORAGE_PHYSICAL].fetch_rows(conn, ref)
+                _STORES[STORAGE_CONSOLIDATED].insert_rows(conn, consolidated,
+                                                          [dict(zip(col_names, row)) for row in rows])
+                backup = _free_table_name(conn, f"{ref.physical_name}_premigration")
+                # The index name would otherwise block a new table of the same name
+                conn.execute(f'DROP INDEX IF EXISTS "{ref.physical_name}_active"')
+                conn.execute(f'ALTER TABLE "{ref.physical_name}" RENAME TO "{backup}"')
+            conn.execute("UPDATE user_tables SET storage=? WHERE id=?", (STORAGE_CONSOLIDATED, ref.table_id))
+            conn.execute("RELEASE migrate_group")
+            migrated += 1
+            print(f"📦 Migrated {ref.physical_name} into strategy_rows ({len(rows) if exists else 0} rows)"
+                  + (f", original kept as {backup}" if exists else ""))
+        except (sqlite3.Error, ValueError, TypeError) as e:
+            conn.execute("ROLLBACK TO migrate_group")
+            conn.execute("RELEASE migrate_group")
+            print(f"❌ Could not migrate {ref.physical_name}: {e}")
+    if migrated:
+        tables.clear()
+    return migrated
+
+
+def upgrade_physical_tables(conn):
+    """Give physical-layout tables created before ID was a primary key an
+    INTEGER PRIMARY KEY on ID plus the partial index on ACTIVE rows.
+
+    SQLite cannot add a primary key in place, so each table is rebuilt and
+    renamed inside its own savepoint (STATUS is upper-cased on the way).
+    Tables already upgraded only get the index ensured; tables with
+    non-numeric or duplicate IDs are left alone. Returns the number rebuilt.
+    """
+    refs = [_ref_from_row(row) for row in conn.execute(
+        f"SELECT {_REF_COLUMNS} FROM user_tables WHERE storage IS NULL OR storage=?", (STORAGE_PHYSICAL,))]
+    upgraded = 0
+    for ref in refs:
+        name = ref.physical_name
+        info = conn.execute(f"PRAGMA table_info({name})").fetchall()  # (cid, name, type, notnull, default, pk)
+        if not info:
+            continue
+        id_column = next((col for col in info if col[1].upper() == "ID"), None)
+        if id_column is None:
+            continue
+        if id_column[5] and id_column[2].upper() == "INTEGER":
+            _create_active_index(conn, name)
+            continue
+
+        bad = conn.execute(f"""
+            SELECT COUNT(*) FROM {name}
+            WHERE ID IS NULL OR CAST(CAST(ID AS INTEGER) AS TEXT) != CAST(ID AS TEXT)
+        """).fetchone()[0]
+        duplicates = conn.execute(f"SELECT COUNT(*) - COUNT(DISTINCT CAST(ID AS INTEGER)) FROM {name}").fetchone()[0]
+        if bad or duplicates:
+            print(f"⚠️ Not upgrading {name}: {bad} non-numeric and {duplicates} duplicate IDs")
+            continue
+
+        column_defs, selects, columns = [], [], []
+        for _, col, col_type, _, _, _ in info:
+            columns.append(f'"{col}"')
+            if col.upper() == "ID":
+                column_defs.append(f'"{col}" INTEGER PRIMARY KEY')
+                selects.append(f'CAST("{col}" AS INTEGER)')
+            else:
+                column_defs.append(f'"{col}" {col_type}'.rstrip())
+                selects.append(f'UPPER("{col}")' if col.upper() == "STATUS" else f'"{col}"')
+
+        conn.execute("SAVEPOINT upgrade_table")
+        try:
+            conn.execute(f'CREATE TABLE "{name}__upgrade" ({", ".join(column_defs)})')
+            conn.execute(f'INSERT INTO "{name}__upgrade" ({", ".join(columns)}) '
+                         f'SELECT {", ".join(selects)} FROM {name} ORDER BY rowid')
+            conn.execute(f'DROP TABLE "{name}"')
+            conn.execute(f'ALTER TABLE "{name}__upgrade" RENAME TO "{name}"')
+            _create_active_index(conn, name)
+            conn.execute("RELEASE upgrade_table")
+            upgraded += 1
+            print(f"🔧 Upgraded {name}: ID is now the primary key")
+        except sqlite3.Error as e:
+            conn.execute("ROLLBACK TO upgrade_table")
+            conn.execute("RELEASE upgrade_table")
+            print(f"❌ Could not upgrade {name}: {e}")
+    if upgraded:
+        tables.clear()
+    return upgraded
@@ -0,0 +1,100 @@
+import json
+import struct
+
+# Framing modes. Every connection starts in legacy mode (4 ASCII digits of
+# length, max 9999 bytes); a client may switch it to binary by sending a
+# "negotiate" request as its first frame.
+FRAMING_LEGACY = "legacy"
+FRAMING_BINARY = "binary"
+SUPPORTED_FRAMINGS = [FRAMING_BINARY, FRAMING_LEGACY]  # in order of preference
+
+# Optional behaviours a client can ask for while negotiating. "async_jobs":
+# strategy requests are acknowledged with {"status": "accepted"} right away
+# and the result is pushed later as a second frame with the same request_id.
+SUPPORTED_FEATURES = ["async_jobs"]
+
+LEGACY_HEADER_SIZE = 4
+LEGACY_MAX_FRAME_SIZE = 9999
+BINARY_HEADER = struct.Struct("!I")  # 4-byte unsigned big-endian body length
+BINARY_MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+
+class FrameError(ValueError):
+    pass
+
+
+def header_size(framing):
+    return BINARY_HEADER.size if framing == FRAMING_BINARY else LEGACY_HEADER_SIZE
+
+
+def max_frame_size(framing):
+    return BINARY_MAX_FRAME_SIZE if framing == FRAMING_BINARY else LEGACY_MAX_FRAME_SIZE
+
+
+def encode_frame(message, framing=FRAMING_LEGACY):
+    """Serialize a message dict into a length-prefixed frame."""
+    body = json.dumps(message).encode('utf-8')
+    if len(body) > max_frame_size(framing):
+        raise FrameError(f"Message too large for {framing} frame ({len(body)} > {max_frame_size(framing)} bytes)")
+    if framing == FRAMING_BINARY:
+        return BINARY_HEADER.pack(len(body)) + body
+    return f"{len(body):04d}".encode('ascii') + body
+
+
+def decode_header(header, framing=FRAMING_LEGACY):
+    """Return the body length described by a frame header."""
+    if framing == FRAMING_BINARY:
+        length = BINARY_HEADER.unpack(header)[0]
+    else:
+        try:
+            length = int(header.decode('ascii'))
+        except (UnicodeDecodeError, ValueError):
+            raise FrameError(f"Invalid frame header: {header!r}")
+    if length > max_frame_size(framing):
+        raise FrameError(f"Frame too large ({length} > {max_frame_size(framing)} bytes)")
+    return length
+
+
+def decode_body(body):
+    return json.loads(body.decode('utf-8'))
+
+
+def recv_exact(sock, length):
+    data = bytearray()
+    while len(data) < length:
+        chunk = sock.recv(min(length - len(data), 1024 * 1024))
+        if not chunk:
+            break
+        data += chunk
+    return bytes(data)
+
+
+def read_frame(sock, framing=FRAMING_LEGACY):
+    """Read one frame from a blocking socket. Returns None on a clean EOF."""
+    size = header_size(framing)
+    header = recv_exact(sock, size)
+    if not header:
+        return None
+    if len(header) < size:
+        raise ConnectionError("Connection closed mid-header")
+    length = decode_header(header, framing)
+    body = recv_exact(sock, length)
+    if len(body) < length:
+        raise ConnectionError("Connection closed mid-frame")
+    return decode_body(body)
+
+
+def negotiate_request(framings=None, features=None):
+    return {
+        "action": "negotiate",
+        "framing": list(framings or SUPPORTED_FRAMINGS),
+        "features": list(SUPPORTED_FEATURES if features is None else features),
+    }
+
+
+def choose_framing(offered):
+    """Pick the first offered framing this side supports."""
+    for framing in offered or []:
+        if framing in SUPPORTED_FRAMINGS:
+            return framing
+    return FRAMING_LEGACY
@@ -1,21 +1,36 @@
-import socket, threading, json, time, argparse
+import socket, threading, argparse, asyncio, itertools
 from datetime import datetime
+from tcp_protocol import (FRAMING_LEGACY, SUPPORTED_FEATURES, FrameError, header_size, decode_header,
+                          decode_body, encode_frame, recv_exact, choose_framing)
+from strategy_jobs import SimulatedStrategyExecutor
+from strategy_registry import StrategyRegistry, AtomicCounter
+from server_metrics import ServerMetrics, start_metrics_http_server
 
 class TradingTCPServer:
-    def __init__(self, host="127.0.0.1", port=9999):
+    # Actions reported individually in metrics; anything else is counted as "unknown"
+    ACTIONS = {'negotiate', 'stats', 'list_strategies', 'apply_strategy', 'stop_strategy',
+               'apply_strategies', 'stop_strategies', 'stop_token'}
+
+    def __init__(self, host="127.0.0.1", port=9999, backlog=128, executor=None, latency=0.1, workers=8):
         self.host = host
         self.port = port
+        self.backlog = backlog
+        # Pluggable strategy engine; the default one simulates `latency` seconds of work
+        self.executor = executor or SimulatedStrategyExecutor(latency=latency, workers=workers)
+        self._job_ids = itertools.count(1)
         self.running = False
-        self.active_strategies = {}
+        self.active_strategies = StrategyRegistry()
         self.server_socket = None
-        self.request_counter = 0
+        self.request_counter = AtomicCounter()
+        self.metrics = ServerMetrics()
+        self.metrics_server = None
 
     def start(self):
         try:
             self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self.server_socket.bind((self.host, self.port))
-            self.server_socket.listen(5)
+            self.server_socket.listen(self.backlog)
             self.running = True
             print(f"🚀 TCP Server started on {self.host}:{self.port}")
 
@@ -36,96 +51,425 @@ class TradingTCPServer:
             finally:
                 self.server_socket.close()
                 print("\n🛑 TCP Server stopped")
+        if self.metrics_server:
+            self.metrics_server.shutdown()
+        self.executor.shutdown()
 
     def _handle_client(self, client_socket, address):
+        # Every connection starts with legacy framing until the client negotiates
+        state = {"framing": FRAMING_LEGACY, "async_jobs": False}
+        send_lock = threading.Lock()  # job completions are pushed from worker threads
+
+        def send(message, framing):
+            try:
+                data = encode_frame(message, framing)
+            except FrameError as e:
+                data = encode_frame(self._error_response(message, e), framing)
+            with send_lock:
+                client_socket.sendall(data)
+            self.metrics.bytes_out.increment(len(data))
+
+        self.metrics.open_connections.increment()
         try:
             while self.running:
-                length_data = self._recv_exact(client_socket, 4)
-                if not length_data:
+                framing = state["framing"]
+                length_data = self._recv_exact(client_socket, header_size(framing))
+                if len(length_data) < header_size(framing):
                     break
 
                 try:
-                    message_length = int(length_data.decode('utf-8'))
-                except ValueError:
+                    message_length = decode_header(length_data, framing)
+                except FrameError:
                     break
 
                 message_data = self._recv_exact(client_socket, message_length)
-                if not message_data:
+                if len(message_data) < message_length:
                     break
+                self.metrics.bytes_in.increment(len(length_data) + message_length)
+
+                request = {}
+                done = threading.Event()
+
+                def reply(response, framing=framing, done=done):
+                    try:
+                        send(response, framing)
+                    except OSError:
+                        pass
+                    finally:
+                        if response.get("status") != "accepted":
+                            done.set()
 
                 try:
-                    request = json.loads(message_data.decode('utf-8'))
-                    self.request_counter += 1
-                    response = self._process_request(request)
-                    response_json = json.dumps(response)
-                    response_message = f"{len(response_json):04d}{response_json}"
-                    client_socket.sendall(response_message.encode('utf-8'))
+                    request = decode_body(message_data)
+                    if not self._dispatch(request, state, reply):
+                        # No ack was sent: this client expects strictly one reply per request
+                        done.wait()
                 except Exception as e:
-                    error_response = {"status": "error", "message": str(e)}
-                    self._send_error_response(client_socket, error_response)
+                    self.metrics.request_failed("invalid")
+                    self._send_error_response(client_socket, self._error_response(request, e), framing)
         finally:
+            self.metrics.open_connections.decrement()
             client_socket.close()
 
+    def _dispatch(self, request, state, reply):
+        """Handle one decoded request for a connection.
+
+        ``reply(response)`` is called with the final response, possibly later
+        and from a worker thread. Strategy jobs from clients that negotiated
+        ``async_jobs`` are first acknowledged with an "accepted" reply; the
+        return value tells the caller whether that happened.
+        """
+        self.request_counter.increment()
+        if not isinstance(request, dict):
+            raise ValueError("Request must be a JSON object")
+        action = request.get('action', '')
+        label = action if action in self.ACTIONS else "unknown"
+        started = self.metrics.request_started(label)
+        send_reply = reply
+
+        def reply(response):
+            if response.get("status") != "accepted":
+                self.metrics.request_finished(label, started, error=response.get("status") == "error")
+            send_reply(response)
+
+        if action == 'negotiate':
+            features = [f for f in request.get('features', []) if f in SUPPORTED_FEATURES]
+            state["framing"] = choose_framing(request.get('framing'))
+            state["async_jobs"] = "async_jobs" in features
+            reply(self._tag(request, {"status": "success", "framing": state["framing"], "features": features}))
+            return False
+
+        job = self._job_for(action)
+        if job is None:
+            reply(self._tag(request, self._process_request(request)))
+            return False
+
+        job_id = next(self._job_ids)
+        acked = state["async_jobs"] and 'request_id' in request
+        if acked:
+            reply(self._tag(request, {"status": "accepted", "job_id": job_id, "action": action}))
+
+        def on_done(result):
+            result["job_id"] = job_id
+            if acked:
+                result["event"] = "job_complete"
+            reply(self._tag(request, result))
+
+        try:
+            self.executor.submit(job, request.get('data', {}), on_done)
+        except Exception as e:
+            # e.g. the executor was shut down: answer now so the gauge and the client are not left waiting
+            reply(self._error_response(request, e))
+        return acked
+
+    def _tag(self, request, response):
+        # Echo the correlation ID so pooled clients can match replies
+        if 'request_id' in request:
+            response['request_id'] = request['request_id']
+        return response
+
+    def _error_response(self, request, error):
+        error_response = {"status": "error", "message": str(error)}
+        if isinstance(request, dict) and 'request_id' in request:
+            error_response['request_id'] = request['request_id']
+        return error_response
+
     def _recv_exact(self, sock, length):
-        data = b''
-        while len(data) < length:
-            chunk = sock.recv(length - len(data))
-            if not chunk:
-                break
-            data += chunk
-        return data
-
-    def _send_error_response(self, client_socket, error_response):
+        return recv_exact(sock, length)
+
+    def _send_error_response(self, client_socket, error_response, framing=FRAMING_LEGACY):
         try:
-            response_json = json.dumps(error_response)
-            response_message = f"{len(response_json):04d}{response_json}"
-            client_socket.sendall(response_message.encode('utf-8'))
+            data = encode_frame(error_response, framing)
+            client_socket.sendall(data)
+            self.metrics.bytes_out.increment(len(data))
         except:
             pass
 
+    def _job_for(self, action):
+        # Strategy work runs on the executor, never on the connection thread
+        if action == 'apply_strategy':
+            return self._handle_apply_strategy
+        elif action == 'stop_strategy':
+            return self._handle_stop_strategy
+        elif action == 'apply_strategies':
+            return lambda data: self._handle_batch(data, self._apply_one)
+        elif action == 'stop_strategies':
+            return lambda data: self._handle_batch(data, self._stop_one)
+        elif action == 'stop_token':
+            return self._handle_stop_token
+        return None
+
     def _process_request(self, request):
         action = request.get('action', '')
         data = request.get('data', {})
 
-        if action == 'apply_strategy':
-            return self._handle_apply_strategy(data)
-        elif action == 'stop_strategy':
-            return self._handle_stop_strategy(data)
+        if action == 'list_strategies':
+            return self._handle_list_strategies(data)
+        elif action == 'stats':
+            return {"status": "success", "stats": self.metrics.snapshot(self._metrics_extra())}
         else:
             return {"status": "error", "message": f"Unknown action: {action}"}
 
-    def _handle_apply_strategy(self, data):
-        strategy_id = f"{data.get('table_type', 'unknown')}_{data.get('row_id', 0)}"
-        self.active_strategies[strategy_id] = {
-            'start_time': datetime.now().isoformat(),
-            'complete_data': data
-        }
-        time.sleep(0.1)
+    def _metrics_extra(self):
+        return {"active_strategies": len(self.active_strategies)}
+
+    def start_metrics_listener(self, port, host="127.0.0.1"):
+        """Expose metrics as Prometheus text over HTTP (localhost only by default)."""
+        self.metrics_server = start_metrics_http_server(
+            lambda: self.metrics.prometheus_text(self._metrics_extra()), host=host, port=port)
+
+    def _strategy_id(self, data):
+        return f"{data.get('table_type', 'unknown')}_{data.get('row_id', 0)}"
+
+    def _apply_one(self, data):
+        strategy_id = self._strategy_id(data)
+        self.active_strategies.add(data.get('user_id'), data.get('workspace_id'), strategy_id, data,
+                                   table_type=data.get('table_type'), token=data.get('InstrumentToken'))
         return {
             "status": "success",
             "message": "Strategy applied successfully",
             "strategy_id": strategy_id,
-            "timestamp": datetime.now().isoformat()
         }
 
-    def _handle_stop_strategy(self, data):
-        strategy_id = f"{data.get('table_type', 'unknown')}_{data.get('row_id', 0)}"
-        self.active_strategies.pop(strategy_id, None)
-        time.sleep(0.1)
+    def _stop_one(self, data):
+        strategy_id = self._strategy_id(data)
+        self.active_strategies.remove(data.get('user_id'), data.get('workspace_id'), strategy_id)
         return {
             "status": "success",
             "message": "Strategy stopped successfully",
             "strategy_id": strategy_id,
+        }
+
+    def _handle_apply_strategy(self, data):
+        response = self._apply_one(data)
+        response["timestamp"] = datetime.now().isoformat()
+        return response
+
+    def _handle_stop_strategy(self, data):
+        response = self._stop_one(data)
+        response["timestamp"] = datetime.now().isoformat()
+        return response
+
+    def _handle_batch(self, data, handler):
+        # One pass over all rows in the frame, one simulated delay per batch job
+        rows = data.get('rows', [])
+        if not isinstance(rows, list):
+            return {"status": "error", "message": "Batch 'rows' must be a list"}
+
+        results = []
+        for row in rows:
+            try:
+                result = handler(row)
+                # Keep per-row results compact so the batch reply stays small
+                result.pop("message", None)
+            except Exception as e:
+                result = {"status": "error", "message": str(e)}
+            result["row_id"] = row.get('row_id') if isinstance(row, dict) else None
+            results.append(result)
+
+        failed = sum(1 for r in results if r["status"] != "success")
+        return {
+            "status": "success" if failed == 0 else "partial",
+            "results": results,
+            "failed": failed,
+            "timestamp": datetime.now().isoformat()
+        }
+
+    def _handle_list_strategies(self, data):
+        # Served from the registry indexes: workspace, then token, then table_type
+        if data.get('workspace_id') is not None:
+            entries = self.active_strategies.for_workspace(data.get('user_id'), data['workspace_id'])
+        elif data.get('token') is not None:
+            entries = self.active_strategies.for_token(data['token'])
+        elif data.get('table_type') is not None:
+            entries = self.active_strategies.for_table_type(data['table_type'])
+        else:
+            return {"status": "error", "message": "list_strategies needs workspace_id, token or table_type"}
+
+        for field in ('user_id', 'token', 'table_type'):
+            if data.get(field) is not None:
+                entries = [e for e in entries if e[field] == str(data[field])]
+
+        strategies = [{k: v for k, v in e.items() if k != 'complete_data'} for e in entries]
+        return {"status": "success", "strategies": strategies, "count": len(strategies)}
+
+    def _handle_stop_token(self, data):
+        token = data.get('token')
+        if token is None:
+            return {"status": "error", "message": "stop_token needs a token"}
+
+        stopped = []
+        for entry in self.active_strategies.for_token(token):
+            if data.get('user_id') is not None and entry['user_id'] != str(data['user_id']):
+                continue
+            if self.active_strategies.remove(entry['user_id'], entry['workspace_id'], entry['strategy_id']):
+                stopped.append(entry['strategy_id'])
+        return {
+            "status": "success",
+            "message": f"Stopped {len(stopped)} strategies on token {token}",
+            "stopped": stopped,
             "timestamp": datetime.now().isoformat()
         }
 
+class AsyncTradingTCPServer(TradingTCPServer):
+    """asyncio flavour of the server: one event loop instead of one thread per client.
+
+    Requests that carry a request_id are handled concurrently and may be
+    answered out of order; requests without one are answered in order.
+    """
+
+    def __init__(self, host="127.0.0.1", port=9999, backlog=1024, max_connections=5000,
+                 max_inflight=64, executor=None, latency=0.1, workers=32):
+        super().__init__(host, port, backlog, executor=executor, latency=latency, workers=workers)
+        self.max_connections = max_connections
+        self.max_inflight = max_inflight  # per connection
+        self.loop = None
+        self.server = None
+
+    def start(self):
+        try:
+            asyncio.run(self._serve())
+        except KeyboardInterrupt:
+            print("\n🛑 Shutting down server")  # asyncio.run has cancelled _serve and closed the loop
+        except Exception as e:
+            print(f"❌ Server error: {e}")
+
+    async def _serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(self._handle_client_async, self.host, self.port,
+                                                 backlog=self.backlog, reuse_address=True)
+        self.running = True
+        print(f"🚀 Async TCP Server started on {self.host}:{self.port} "
+              f"(backlog={self.backlog}, max_connections={self.max_connections})")
+        async with self.server:
+            try:
+                await self.server.serve_forever()
+            except asyncio.CancelledError:
+                pass
+            finally:
+                self.running = False
+                self.server.close()
+
+    def stop(self):
+        self.running = False
+        try:
+            if self.loop is not None and not self.loop.is_closed() and self.server:
+                self.loop.call_soon_threadsafe(self.server.close)
+        except RuntimeError:
+            pass  # loop closed between the check and the call
+        finally:
+            print("\n🛑 TCP Server stopped")
+            if self.metrics_server:
+                self.metrics_server.shutdown()
+            self.executor.shutdown()
+
+    async def _handle_client_async(self, reader, writer):
+        if self.metrics.open_connections.value >= self.max_connections:
+            self.metrics.connection_rejected()
+            writer.write(encode_frame({"status": "error", "message": "Server busy: connection limit reached"}))
+            writer.close()
+            return
+
+        self.metrics.open_connections.increment()
+        state = {"framing": FRAMING_LEGACY, "async_jobs": False}
+        inflight = asyncio.Semaphore(self.max_inflight)
+        write_lock = asyncio.Lock()
+        tasks = set()
+
+        async def send(message, framing, done):
+            try:
+                try:
+                    data = encode_frame(message, framing)
+                except FrameError as e:
+                    data = encode_frame(self._error_response(message, e), framing)
+                async with write_lock:
+                    writer.write(data)
+                    self.metrics.bytes_out.increment(len(data))
+                    # Backpressure: wait for the socket buffer to drain before writing more
+                    await writer.drain()
+            except ConnectionError:
+                pass
+            finally:
+                if message.get("status") != "accepted":
+                    inflight.release()
+                    if not done.done():
+                        done.set_result(None)
+
+        def make_reply(framing):
+            done = self.loop.create_future()
+
+            def deliver(message):
+                task = asyncio.create_task(send(message, framing, done))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            # Job completions arrive on executor threads
+            def reply(message):
+                self.loop.call_soon_threadsafe(deliver, message)
+            return reply, done
+
+        try:
+            while self.running:
+                framing = state["framing"]
+                try:
+                    header = await reader.readexactly(header_size(framing))
+                    message_length = decode_header(header, framing)
+                    message_data = await reader.readexactly(message_length)
+                except (asyncio.IncompleteReadError, asyncio.CancelledError, FrameError):
+                    break
+                self.metrics.bytes_in.increment(len(header) + message_length)
+
+                # Stop reading once this connection has max_inflight requests pending
+                await inflight.acquire()
+                reply, done = make_reply(framing)
+                request = {}
+                try:
+                    request = decode_body(message_data)
+                    acked = self._dispatch(request, state, reply)
+                except Exception as e:
+                    self.metrics.request_failed("invalid")
+                    reply(self._error_response(request, e))
+                    acked = False
+
+                # Negotiation and uncorrelated requests (malformed ones too) must keep their order
+                if not acked and (not isinstance(request, dict) or request.get('action') == 'negotiate'
+                                  or 'request_id' not in request):
+                    await done
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            for task in list(tasks):
+                task.cancel()
+            self.metrics.open_connections.decrement()
+            writer.close()
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--port', '-p', type=int, default=9999)
     parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='serve clients from an asyncio event loop instead of one thread each')
+    parser.add_argument('--backlog', type=int, default=1024)
+    parser.add_argument('--max-connections', type=int, default=5000)
+    parser.add_argument('--max-inflight', type=int, default=64,
+                        help='pipelined requests per connection before reads pause (async mode)')
+    parser.add_argument('--workers', type=int, default=32, help='strategy job worker threads')
+    parser.add_argument('--latency', type=float, default=0.1,
+                        help='simulated strategy execution time in seconds')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='serve Prometheus-style metrics on http://127.0.0.1:PORT/metrics')
     args = parser.parse_args()
 
-    server = TradingTCPServer(host=args.host, port=args.port)
+    if args.use_async:
+        server = AsyncTradingTCPServer(host=args.host, port=args.port, backlog=args.backlog,
+                                       max_connections=args.max_connections, max_inflight=args.max_inflight,
+                                       latency=args.latency, workers=args.workers)
+    else:
+        server = TradingTCPServer(host=args.host, port=args.port, backlog=args.backlog,
+                                  latency=args.latency, workers=args.workers)
+    if args.metrics_port:
+        server.start_metrics_listener(args.metrics_port)
     try:
         server.start()
     except KeyboardInterrupt:
@@ -0,0 +1,72 @@
+import json
+import threading
+import time
+from collections import deque
+
+# Fields recorded for every send_tcp_command round trip, all in milliseconds:
+#   queue_ms     enqueue -> picked up by a pooled connection's writer
+#   connect_ms   time spent (re)connecting + negotiating for this send (0 when reused)
+#   send_ms      encode + sendall
+#   ttfb_ms      send finished -> first reply frame header (ack or result)
+#   total_ms     enqueue -> final reply decoded
+#   dispatch_ms  final reply decoded -> callback started
+#   callback_ms  time spent inside the callback
+TIMING_FIELDS = ("queue_ms", "connect_ms", "send_ms", "ttfb_ms", "total_ms", "dispatch_ms", "callback_ms")
+
+
+class TraceBuffer:
+    """Fixed-size ring buffer of per-command timing records."""
+
+    def __init__(self, capacity=4096):
+        self._records = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def record(self, trace):
+        with self._lock:
+            self._records.append(trace)
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._records)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+    def percentiles(self, field="total_ms", percents=(50, 99)):
+        values = sorted(r[field] for r in self.snapshot() if r.get(field) is not None)
+        if not values:
+            return {p: None for p in percents}
+        return {p: values[min(len(values) - 1, int(len(values) * p / 100))] for p in percents}
+
+    def dump_jsonl(self, path):
+        records = self.snapshot()
+        with open(path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        return len(records)
+
+
+def new_trace(request_id, action):
+    return {
+        "request_id": request_id,
+        "action": action,
+        "timestamp": time.time(),
+        "t_enqueue": time.perf_counter(),
+        "connect_ms": 0.0,
+    }
+
+
+def elapsed_ms(start, end=None):
+    return round(((end if end is not None else time.perf_counter()) - start) * 1000, 3)
+
+
+def finish_trace(trace, status):
+    """Drop the raw perf_counter marks and keep only durations."""
+    trace["status"] = status
+    for key in [k for k in trace if k.startswith("t_")]:
+        del trace[key]
+    return trace
+
+
+TRACES = TraceBuffer()
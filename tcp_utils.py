@@ -1,41 +1,284 @@
 import socket
 import threading
 import json
+import itertools
+import queue
+import time
+from tcp_protocol import (FRAMING_LEGACY, FRAMING_BINARY, SUPPORTED_FRAMINGS, FrameError, header_size,
+                          decode_header, decode_body, encode_frame, read_frame, recv_exact, negotiate_request)
+from tcp_trace import TRACES, new_trace, elapsed_ms, finish_trace
 
-def send_tcp_command(command_dict, callback=None, host='127.0.0.1', port=9999):
-    def client_thread():
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 9999
+DEFAULT_POOL_SIZE = 4
+CONNECT_TIMEOUT = 5.0
+
+# (max rows, max request bytes) per batch frame. Legacy frames are capped at
+# 9999 bytes, so keep chunks small enough for the per-row reply to fit too.
+BATCH_LIMITS = {
+    FRAMING_LEGACY: (50, 9999 - 256),
+    FRAMING_BINARY: (1000, 1024 * 1024),
+}
+
+
+class _PooledConnection:
+    """One persistent socket to the strategy server.
+
+    A writer thread pulls commands from the client's shared queue and a
+    reader thread matches replies to pending callbacks by ``request_id``.
+    The socket is (re)opened lazily by the writer whenever it is down.
+    """
+
+    def __init__(self, client, index):
+        self.client = client
+        self.index = index
+        self.sock = None
+        self.framing = None  # set by the first negotiation, kept across reconnects
+        self.pending = {}  # request_id -> (callback, trace), in send order
+        self.lock = threading.Lock()
+        self.writer = threading.Thread(target=self._writer_loop, daemon=True,
+                                       name=f"tcp-writer-{index}")
+        self.writer.start()
+
+    def _connect(self):
+        sock = socket.create_connection((self.client.host, self.client.port),
+                                        timeout=self.client.connect_timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        # Ask for binary framing; servers that don't know "negotiate" answer
+        # with an error and the connection simply stays on legacy framing.
+        framing = FRAMING_LEGACY
+        if self.client.framings != [FRAMING_LEGACY]:
+            try:
+                sock.sendall(encode_frame(negotiate_request(self.client.framings), FRAMING_LEGACY))
+                reply = read_frame(sock, FRAMING_LEGACY)
+            except (OSError, ValueError):
+                sock.close()
+                raise
+            if reply is None:
+                sock.close()
+                raise ConnectionError("Connection closed during negotiation")
+            if reply.get("status") == "success" and reply.get("framing") in self.client.framings:
+                framing = reply["framing"]
+        sock.settimeout(None)
+
+        with self.lock:
+            self.sock = sock
+            self.framing = framing
+        self.client.framing = framing
+        threading.Thread(target=self._reader_loop, args=(sock, framing), daemon=True,
+                         name=f"tcp-reader-{self.index}").start()
+
+    def _close(self, sock, reason):
+        # Fail everything still waiting on this socket so callers never hang
+        with self.lock:
+            current = self.sock is sock
+            if current:
+                self.sock = None
+                failed = list(self.pending.values())
+                self.pending.clear()
+            else:
+                failed = []
+        try:
+            sock.close()
+        except OSError:
+            pass
+        for callback, trace in failed:
+            _invoke(callback, {"status": "error", "error": reason, "message": reason}, trace)
+
+    def _writer_loop(self):
+        while True:
+            item = self.client._queue.get()
+            if item is None:
+                break
+            request_id, command, callback, trace = item
+            started = time.perf_counter()
+            trace["queue_ms"] = elapsed_ms(trace["t_enqueue"], started)
+
+            # A dropped connection is only noticed on the next send, so retry
+            # once on a fresh socket before reporting the error.
+            for attempt in range(2):
+                sock = self.sock
+                try:
+                    if sock is None:
+                        connect_started = time.perf_counter()
+                        self._connect()
+                        sock = self.sock
+                        trace["connect_ms"] += elapsed_ms(connect_started)
+                    send_started = time.perf_counter()
+                    full_message = encode_frame(command, self.framing)
+                    with self.lock:
+                        self.pending[request_id] = (callback, trace)
+                    sock.sendall(full_message)
+                    trace["t_sent"] = time.perf_counter()
+                    trace["send_ms"] = elapsed_ms(send_started, trace["t_sent"])
+                    break
+                except FrameError as e:
+                    print("TCP Error:", e)
+                    _invoke(callback, {"status": "error", "error": str(e), "message": str(e)}, trace)
+                    break
+                except (OSError, ValueError) as e:
+                    with self.lock:
+                        self.pending.pop(request_id, None)
+                    if sock is not None:
+                        self._close(sock, str(e))
+                    if attempt == 1:
+                        print("TCP Error:", e)
+                        _invoke(callback, {"status": "error", "error": str(e), "message": str(e)}, trace)
+
+    def _reader_loop(self, sock, framing):
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-                sock.connect((host, port))
-                
-                # Encode message with 4-digit length prefix
-                message = json.dumps(command_dict)
-                length_prefix = f"{len(message):04d}"
-                full_message = length_prefix + message
-                sock.sendall(full_message.encode('utf-8'))
-
-                # Receive 4-byte length prefix
-                response_length_data = sock.recv(4)
-                if not response_length_data:
-                    raise ValueError("No response length received")
-                response_length = int(response_length_data.decode('utf-8'))
-
-                # Receive the actual response body
-                response_data = b""
-                while len(response_data) < response_length:
-                    chunk = sock.recv(response_length - len(response_data))
-                    if not chunk:
-                        break
-                    response_data += chunk
-
-                response = json.loads(response_data.decode('utf-8'))
-
-                if callback:
-                    callback(response)
-
-        except Exception as e:
-            print("TCP Error:", e)
-            if callback:
-                callback({"status": "error", "error": str(e)})
-
-    threading.Thread(target=client_thread, daemon=True).start()
+            while True:
+                header = recv_exact(sock, header_size(framing))
+                if len(header) < header_size(framing):
+                    raise ConnectionError("Connection closed by server")
+                first_byte = time.perf_counter()
+                length = decode_header(header, framing)
+                body = recv_exact(sock, length)
+                if len(body) < length:
+                    raise ConnectionError("Connection closed by server")
+                response = decode_body(body)
+
+                with self.lock:
+                    request_id = response.get("request_id")
+                    if request_id in self.pending:
+                        entry = self.pending[request_id]
+                    elif self.pending:
+                        # Peer does not echo request_id: replies arrive in send order
+                        request_id = next(iter(self.pending))
+                        entry = self.pending[request_id]
+                    else:
+                        entry = (None, None)
+                    if response.get("status") != "accepted":
+                        self.pending.pop(request_id, None)
+
+                callback, trace = entry
+                if trace is not None and "ttfb_ms" not in trace and "t_sent" in trace:
+                    trace["ttfb_ms"] = elapsed_ms(trace["t_sent"], first_byte)
+                if response.get("status") == "accepted":
+                    continue  # job acknowledged; its result arrives in a later frame
+                _invoke(callback, response, trace)
+        except (OSError, ValueError) as e:
+            if self.sock is sock:
+                print("TCP Error:", e)
+                self._close(sock, str(e))
+
+
+class TCPClient:
+    """Long-lived client with a bounded pool of persistent connections.
+
+    Every command is tagged with a ``request_id`` so replies can be matched
+    to their callbacks; the thread count is ``2 * pool_size`` regardless of
+    how many commands are in flight.
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, pool_size=DEFAULT_POOL_SIZE,
+                 connect_timeout=CONNECT_TIMEOUT, framings=None):
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        # Pass framings=[FRAMING_LEGACY] to talk to peers that predate negotiation
+        self.framings = list(framings or SUPPORTED_FRAMINGS)
+        self.framing = FRAMING_LEGACY  # last negotiated framing
+        self._queue = queue.SimpleQueue()
+        self._ids = itertools.count(1)
+        self._connections = [_PooledConnection(self, i) for i in range(pool_size)]
+
+    def send(self, command_dict, callback=None):
+        request_id = next(self._ids)
+        command = dict(command_dict, request_id=request_id)
+        trace = new_trace(request_id, command.get("action", ""))
+        self._queue.put((request_id, command, callback, trace))
+        return request_id
+
+    def batch_limits(self):
+        """(max rows, max bytes) for a batch chunk. Chunks go to whichever
+        connection is free, so use legacy limits while any connection is on
+        legacy framing (one not connected yet is assumed to get the last
+        negotiated framing)."""
+        framings = {conn.framing or self.framing for conn in self._connections}
+        return BATCH_LIMITS[FRAMING_LEGACY if FRAMING_LEGACY in framings else self.framing]
+
+    def close(self):
+        for conn in self._connections:
+            self._queue.put(None)
+        for conn in self._connections:
+            sock = conn.sock
+            if sock is not None:
+                conn._close(sock, "Client closed")
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    with _clients_lock:
+        client = _clients.get((host, port))
+        if client is None:
+            client = _clients[(host, port)] = TCPClient(host, port)
+        return client
+
+
+def send_tcp_command(command_dict, callback=None, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    return get_client(host, port).send(command_dict, callback)
+
+
+def iter_batches(rows, max_rows, max_bytes):
+    """Split rows into chunks that each fit in a single frame."""
+    chunk, size = [], 0
+    for row in rows:
+        row_size = len(json.dumps(row).encode('utf-8')) + 2
+        if chunk and (len(chunk) >= max_rows or size + row_size > max_bytes):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(row)
+        size += row_size
+    if chunk:
+        yield chunk
+
+
+def send_tcp_batch(action, rows, callback=None, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Send rows as batch frames; ``callback(response, chunk)`` runs once per chunk."""
+    client = get_client(host, port)
+    max_rows, max_bytes = client.batch_limits()
+    for chunk in iter_batches(rows, max_rows, max_bytes):
+        on_response = None
+        if callback:
+            on_response = lambda response, chunk=chunk: callback(response, chunk)
+        client.send({"action": action, "data": {"rows": chunk}}, on_response)
+
+
+_callback_dispatcher = None
+
+
+def set_callback_dispatcher(post):
+    """Route every TCP callback through ``post(fn, *args)``, e.g. onto the Tk
+    main loop. ``None`` runs callbacks inline on the connection's reader thread."""
+    global _callback_dispatcher
+    _callback_dispatcher = post
+
+
+def _invoke(callback, response, trace=None):
+    if trace is not None:
+        trace["t_response"] = time.perf_counter()
+        trace["total_ms"] = elapsed_ms(trace["t_enqueue"], trace["t_response"])
+    post = _callback_dispatcher
+    if post is not None:
+        post(_run_callback, callback, response, trace)
+    else:
+        _run_callback(callback, response, trace)
+
+
+def _run_callback(callback, response, trace=None):
+    started = time.perf_counter()
+    try:
+        if callback is not None:
+            callback(response)
+    except Exception as e:
+        print("TCP callback error:", e)
+    finally:
+        if trace is not None:
+            trace["dispatch_ms"] = elapsed_ms(trace["t_response"], started)
+            trace["callback_ms"] = elapsed_ms(started)
+            TRACES.record(finish_trace(trace, response.get("status")))
@@ -0,0 +1,59 @@
+import pytest
+
+import db_handler
+import strategy_store
+from status_counters import counters
+from ui_workspace_view import add_strategy_rows
+
+INSTRUMENTS = [
+    ("NIFTY25JUN22000CE", "NIFTY", "1001"),
+    ("NIFTY25JUN22000PE", "NIFTY", "1002"),
+    ("NIFTY25JUN22100CE", "NIFTY", "1003"),
+]
+
+
+@pytest.fixture
+def table(tmp_path, monkeypatch):
+    """A fresh strategy table in a throwaway users.db, with no counters seeded."""
+    monkeypatch.chdir(tmp_path)  # db_handler.DB_PATH is relative
+    monkeypatch.setattr(db_handler, "_pools", {})
+    db_handler.init_db()
+    db_handler.add_user("Test User", "test@example.com", "secret")
+    user_id = db_handler.get_user_id("test@example.com")
+    db_handler.create_workspace(user_id, "Main", set_as_default=True)
+    workspace_id = db_handler.get_default_workspace_id(user_id)
+    conn = db_handler.connect()
+    ref = strategy_store.create_table(conn, user_id, workspace_id, "COUNTED", [])
+    conn.commit()
+    conn.close()
+    counters.clear()
+    yield ref
+    counters.clear()
+    strategy_store.tables.clear()
+    db_handler.get_pool().close_all()
+
+
+def test_first_bulk_add_into_unseeded_table_counts_each_row_once(table):
+    conn = db_handler.connect()
+    try:
+        add_strategy_rows(conn, table.user_id, table, INSTRUMENTS)
+        assert counters.get(table) == (0, 3)
+
+        add_strategy_rows(conn, table.user_id, table, INSTRUMENTS[:1])
+        assert counters.get(table) == (0, 4)
+    finally:
+        conn.close()
+
+
+def test_first_delete_from_unseeded_table_counts_the_row_once(table):
+    conn = db_handler.connect()
+    try:
+        rows = add_strategy_rows(conn, table.user_id, table, INSTRUMENTS)
+        counters.clear()
+
+        strategy_store.delete_row(conn, table, rows[0]["ID"])
+        conn.commit()
+        counters.row_removed(table, rows[0]["ID"])
+        assert counters.get(table) == (0, 2)
+    finally:
+        conn.close()
@@ -0,0 +1,99 @@
+import queue
+import tkinter as tk
+import tcp_utils
+
+FRAME_INTERVAL_MS = 16  # one drain per ~frame
+MAX_BATCH = 500  # callbacks handled per tick before yielding back to Tk
+
+_dispatcher = None
+
+
+class UIDispatcher:
+    """Runs work posted from background threads on the Tk main loop.
+
+    Posted callbacks are drained in batches once per tick. Functions passed
+    to ``coalesce`` run once at the end of a batch however many times they
+    were requested, so e.g. thousands of row updates refresh the status
+    label once.
+    """
+
+    def __init__(self, root, interval_ms=FRAME_INTERVAL_MS, max_batch=MAX_BATCH):
+        self.root = root
+        self.interval_ms = interval_ms
+        self.max_batch = max_batch
+        self._queue = queue.SimpleQueue()
+        self._coalesced = {}
+        self._after_id = None
+        self._running = True
+        self._schedule()
+
+    def post(self, fn, *args):
+        """Thread-safe: queue ``fn(*args)`` for the next tick."""
+        self._queue.put((fn, args))
+
+    def coalesce(self, fn):
+        """Main thread only: run ``fn()`` once after the current batch."""
+        self._coalesced[fn] = None
+
+    def stop(self):
+        self._running = False
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except tk.TclError:
+                pass
+            self._after_id = None
+
+    def _schedule(self):
+        try:
+            self._after_id = self.root.after(self.interval_ms, self._drain)
+        except tk.TclError:
+            # Root window is gone: stop routing TCP callbacks here
+            uninstall(self)
+
+    def _drain(self):
+        self._after_id = None
+        if not self._running:
+            return
+        for _ in range(self.max_batch):
+            try:
+                fn, args = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                fn(*args)
+            except Exception as e:
+                print("UI dispatch error:", e)
+
+        coalesced, self._coalesced = self._coalesced, {}
+        for fn in coalesced:
+            try:
+                fn()
+            except Exception as e:
+                print("UI dispatch error:", e)
+
+        if self._running:
+            self._schedule()
+
+
+def install(root):
+    """Create (or reuse) the dispatcher for ``root`` and route TCP callbacks through it."""
+    global _dispatcher
+    if _dispatcher is not None and _dispatcher.root is root and _dispatcher._running:
+        return _dispatcher
+    if _dispatcher is not None:
+        _dispatcher.stop()
+    _dispatcher = UIDispatcher(root)
+    tcp_utils.set_callback_dispatcher(_dispatcher.post)
+    return _dispatcher
+
+
+def uninstall(dispatcher=None):
+    global _dispatcher
+    if dispatcher is not None and dispatcher is not _dispatcher:
+        dispatcher.stop()
+        return
+    if _dispatcher is not None:
+        _dispatcher.stop()
+        _dispatcher = None
+    tcp_utils.set_callback_dispatcher(None)
@@ -4,14 +4,14 @@ from db_handler import verify_user
 import ui_signup
 import ui_workspace
 import db_handler
+import strategy_store
+from status_counters import counters as status_counters
 from window_utils import center_window, _perform_centering_on_restore, on_configure, cleanup_window
 
 def reinitialize_session_ids(user_id):
-    import sqlite3
-    conn = sqlite3.connect("users.db")
+    conn = db_handler.connect()
     cur = conn.cursor()
 
-    all_rows = []
     current_id = 1  # Start fresh for this user
 
     # Step 1: Get all workspaces for the user ordered by creation time
@@ -24,30 +24,14 @@ def reinitialize_session_ids(user_id):
 
     # Step 2: For each workspace, get associated tables
     for workspace_id in workspaces:
-        cur.execute("""
-            SELECT table_name, physical_table_name
-            FROM user_tables
-            WHERE user_id = ? AND workspace_id = ?
-        """, (user_id, workspace_id))
-        tables = cur.fetchall()
-
-        # Step 3: For each table, fetch its rows
-        for table_name, physical_table in tables:
+        tables = strategy_store.tables_for_workspace(conn, user_id, workspace_id)
+
+        # Steps 3-4: Reassign each table's row IDs using the running counter
+        for table in tables:
             try:
-                cur.execute(f"SELECT ID FROM {physical_table}")
-                rows = cur.fetchall()
-
-                # Step 4: Reassign new IDs using the running counter
-                for row in rows:
-                    old_id = row[0]
-                    cur.execute(f"""
-                        UPDATE {physical_table}
-                        SET ID = ?
-                        WHERE ID = ?
-                    """, (current_id, old_id))
-                    current_id += 1
-            except sqlite3.Error as e:
-                print(f"Error processing table {physical_table}: {e}")
+                current_id = strategy_store.renumber(conn, table, current_id)
+            except db_handler.sqlite3.Error as e:
+                print(f"Error processing table {table.table_name}: {e}")
                 continue
 
     # Step 5: Update user's session counter
@@ -58,9 +42,10 @@ def reinitialize_session_ids(user_id):
 
     conn.commit()
     conn.close()
+    status_counters.clear()  # row ids changed
 
-def login_window():
-    """Creates and displays the login window."""
+def login_window(on_shown=None):
+    """Creates and displays the login window. ``on_shown`` runs once the window is up."""
     win = tk.Tk()
     win.title("LOGIN")
     win.geometry("400x300")
@@ -117,5 +102,7 @@ def login_window():
 
     tk.Button(frame, text="Login", width=20, command=login, bg="#2196F3", fg="white", font=("Arial", 10, "bold")).pack(pady=10)
     tk.Button(frame, text="Go to Signup", width=20, bg="#07365C", fg="white", font=("Arial", 10, "bold","underline"), command=lambda:[cleanup_window(win), win.destroy(), ui_signup.signup_window()]).pack()
+    if on_shown:
+        win.after_idle(on_shown)
     win.mainloop()
  
\ No newline at end of file
@@ -0,0 +1,322 @@
+import tkinter as tk
+from tkinter import ttk
+
+SELECT_COL = "_select"
+ACTION_COLS = ("_apply", "_stop", "_delete")
+ACTION_ICONS = {"_apply": "✅", "_stop": "⛔", "_delete": "🗑️"}
+
+STATUS_COLORS = {"ACTIVE": "#c7f9cc", "WAITING": "#fcd34d"}
+STRIPE_COLORS = ("#e5e7eb", "#f9fafb")
+PAGE_SIZE = 200  # rows fetched per page as the user scrolls
+LOAD_AHEAD = 0.9  # fetch the next page once the view reaches this far down
+
+
+class StrategyGrid:
+    """Strategy table view on a single ttk.Treeview.
+
+    Rows are Treeview items rather than widgets, so only the visible rows
+    are ever drawn and a table of thousands of rows costs a few widgets in
+    total. Editable cells are edited through one floating Entry placed over
+    the cell. The Apply/Stop/Delete columns behave like the old per-row
+    buttons: a click calls ``on_apply``/``on_stop``/``on_delete`` with the
+    row id, and is ignored while the row's status disables that action.
+
+    With ``set_page_source`` rows are loaded a page at a time: the next
+    page is requested when the user scrolls near the bottom of what is
+    loaded, keyed on the last loaded ID.
+    """
+
+    def __init__(self, parent, columns, editable=(), validators=None,
+                 on_apply=None, on_stop=None, on_delete=None, on_edit=None, height=20):
+        self.columns = list(columns)
+        self.col_index = {name: idx for idx, name in enumerate(self.columns)}
+        self.editable = set(editable)
+        self.validators = validators or {}
+        self.on_apply = on_apply
+        self.on_stop = on_stop
+        self.on_delete = on_delete
+        self.on_edit = on_edit
+
+        self._rows = {}  # iid -> list of column values
+        self._ids = {}  # iid -> row id as the caller knows it
+        self._status = {}  # iid -> displayed status
+        self._stripe = {}  # iid -> background stripe tag, fixed at insert
+        self._selected = set()  # iids ticked in the Select column
+        self._editor = None
+        self._page_source = None  # callable(after_id, limit) -> rows
+        self._last_id = None  # ID of the last row loaded from the page source
+        self._exhausted = True
+        self._load_scheduled = False
+
+        self.frame = tk.Frame(parent)
+        tree_columns = (SELECT_COL, *self.columns, *ACTION_COLS)
+        self.tree = ttk.Treeview(self.frame, columns=tree_columns, show="headings", height=height,
+                                 selectmode="browse")
+        yscroll = ttk.Scrollbar(self.frame, orient="vertical", command=self._yview)
+        xscroll = ttk.Scrollbar(self.frame, orient="horizontal", command=self._xview)
+        self._yscroll = yscroll
+        self.tree.configure(yscrollcommand=self._on_yscroll, xscrollcommand=xscroll.set)
+
+        self.tree.heading(SELECT_COL, text="Select")
+        self.tree.column(SELECT_COL, width=60, anchor="center", stretch=False)
+        for name in self.columns:
+            # Editable columns are marked in the heading, as headings cannot be coloured
+            self.tree.heading(name, text=f"{name} ✎" if name in self.editable else name)
+            self.tree.column(name, width=120, anchor="center")
+        for name, title in zip(ACTION_COLS, ("Apply", "Stop", "Delete")):
+            self.tree.heading(name, text=title)
+            self.tree.column(name, width=70, anchor="center", stretch=False)
+
+        for status, color in STATUS_COLORS.items():
+            self.tree.tag_configure(status, background=color)
+        for parity, color in enumerate(STRIPE_COLORS):
+            self.tree.tag_configure(f"stripe{parity}", background=color)
+
+        self.tree.bind("<Button-1>", self._on_click)
+        self.tree.bind("<Double-Button-1>", self._on_double_click)
+        self.tree.bind("<MouseWheel>", lambda e: self.commit_edit(), add="+")
+
+        yscroll.pack(side="right", fill="y")
+        xscroll.pack(side="bottom", fill="x")
+        self.tree.pack(side="left", fill="both", expand=True)
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def destroy(self):
+        self.frame.destroy()
+
+    # --- rows ---
+
+    def _iid(self, row_id):
+        return str(row_id)
+
+    def _values(self, iid):
+        status = self._status.get(iid, "")
+        row = self._rows[iid]
+        select = "☑" if iid in self._selected else "☐"
+        apply = ACTION_ICONS["_apply"] if status != "ACTIVE" else ""
+        stop = ACTION_ICONS["_stop"] if status != "INACTIVE" else ""
+        delete = ACTION_ICONS["_delete"] if status != "ACTIVE" else ""
+        return (select, *("" if v is None else v for v in row), apply, stop, delete)
+
+    def _tags(self, iid):
+        status = self._status.get(iid, "")
+        if status in STATUS_COLORS:
+            return (status,)
+        return (self._stripe[iid],)
+
+    def _refresh(self, iid):
+        self.tree.item(iid, values=self._values(iid), tags=self._tags(iid))
+
+    def set_rows(self, rows):
+        """Replace every row; ``rows`` are sequences in column order."""
+        self.cancel_edit()
+        self.tree.delete(*self.tree.get_children())
+        self._rows.clear()
+        self._ids.clear()
+        self._status.clear()
+        self._stripe.clear()
+        self._selected.clear()
+        for row in rows:
+            self.insert_row(row)
+
+    def set_page_source(self, source, page_size=PAGE_SIZE):
+        """Replace every row with the first page from ``source(after_id, limit)``."""
+        self._page_source = source
+        self.page_size = page_size
+        self._last_id = None
+        self._exhausted = False
+        self.set_rows([])
+        self.load_next_page()
+
+    def load_next_page(self):
+        self._load_scheduled = False
+        if self._page_source is None or self._exhausted:
+            return
+        rows = self._page_source(self._last_id, self.page_size)
+        id_idx = self.col_index["ID"]
+        for row in rows:
+            if self._iid(row[id_idx]) in self._rows:
+                self.upsert_row(row)
+            else:
+                self.insert_row(row)
+        if rows:
+            self._last_id = rows[-1][id_idx]
+        self._exhausted = len(rows) < self.page_size
+
+    @property
+    def fully_loaded(self):
+        return self._exhausted
+
+    def _on_yscroll(self, first, last):
+        self._yscroll.set(first, last)
+        if not self._exhausted and not self._load_scheduled and float(last) >= LOAD_AHEAD:
+            self._load_scheduled = True
+            self.tree.after_idle(self.load_next_page)
+
+    def insert_row(self, row, index="end"):
+        id_idx = self.col_index["ID"]
+        status_idx = self.col_index.get("STATUS")
+        iid = self._iid(row[id_idx])
+        self._rows[iid] = list(row)
+        self._ids[iid] = row[id_idx]
+        status = str(row[status_idx]).upper() if status_idx is not None else ""
+        self._status[iid] = status
+        self._stripe[iid] = f"stripe{len(self._rows) % 2}"
+        if status == "ACTIVE":
+            self._selected.add(iid)
+        self.tree.insert("", index, iid=iid, values=self._values(iid), tags=self._tags(iid))
+
+    def upsert_row(self, row):
+        """Update a row in place, or append it if it is not shown yet."""
+        iid = self._iid(row[self.col_index["ID"]])
+        if iid not in self._rows:
+            self.insert_row(row)
+            return
+        if self._editor is not None and self._editor.iid == iid:
+            self.cancel_edit()
+        waiting = self._status.get(iid) == "WAITING"
+        self._rows[iid] = list(row)
+        status_idx = self.col_index.get("STATUS")
+        if waiting:
+            # The server has not replied yet; keep showing WAITING until it does
+            if status_idx is not None:
+                self._rows[iid][status_idx] = "WAITING"
+            self._refresh(iid)
+        elif status_idx is not None:
+            self.set_status(row[self.col_index["ID"]], str(row[status_idx]))
+        else:
+            self._refresh(iid)
+
+    def remove_row(self, row_id):
+        iid = self._iid(row_id)
+        if iid not in self._rows:
+            return
+        if self._editor is not None and self._editor.iid == iid:
+            self.cancel_edit()
+        self.tree.delete(iid)
+        for store in (self._rows, self._ids, self._status, self._stripe):
+            store.pop(iid, None)
+        self._selected.discard(iid)
+
+    def row_ids(self):
+        return [self._ids[iid] for iid in self.tree.get_children()]
+
+    def has_row(self, row_id):
+        return self._iid(row_id) in self._rows
+
+    def row_data(self, row_id):
+        """Current values of a row as {column: value}."""
+        iid = self._iid(row_id)
+        return dict(zip(self.columns, self._rows[iid]))
+
+    def set_status(self, row_id, status):
+        iid = self._iid(row_id)
+        if iid not in self._rows:
+            return
+        status = status.upper()
+        self._status[iid] = status
+        if "STATUS" in self.col_index:
+            self._rows[iid][self.col_index["STATUS"]] = status
+        if status in ("ACTIVE", "WAITING"):
+            self._selected.add(iid)
+        else:
+            self._selected.discard(iid)
+        self._refresh(iid)
+
+    def status(self, row_id):
+        return self._status.get(self._iid(row_id))
+
+    # --- events ---
+
+    def _yview(self, *args):
+        self.commit_edit()
+        self.tree.yview(*args)
+
+    def _xview(self, *args):
+        self.commit_edit()
+        self.tree.xview(*args)
+
+    def _cell_at(self, event):
+        if self.tree.identify_region(event.x, event.y) != "cell":
+            return None, None
+        iid = self.tree.identify_row(event.y)
+        column = self.tree.identify_column(event.x)  # "#1", "#2", ...
+        if not iid or not column:
+            return None, None
+        names = self.tree["columns"]
+        return iid, names[int(column[1:]) - 1]
+
+    def _on_click(self, event):
+        self.commit_edit()
+        iid, column = self._cell_at(event)
+        if iid is None:
+            return
+        status = self._status.get(iid, "")
+        row_id = self._ids[iid]
+        if column == SELECT_COL:
+            self._selected.symmetric_difference_update({iid})
+            self._refresh(iid)
+        elif column == "_apply" and status != "ACTIVE" and self.on_apply:
+            self.on_apply(row_id)
+        elif column == "_stop" and status != "INACTIVE" and self.on_stop:
+            self.on_stop(row_id)
+        elif column == "_delete" and status != "ACTIVE" and self.on_delete:
+            self.on_delete(row_id)
+        elif column in self.editable:
+            self.begin_edit(iid, column)
+            return "break"  # keep the class binding from pulling focus off the editor
+
+    def _on_double_click(self, event):
+        iid, column = self._cell_at(event)
+        if iid is not None and column in self.editable:
+            self.begin_edit(iid, column)
+            return "break"
+
+    # --- floating editor ---
+
+    def begin_edit(self, iid, column):
+        self.cancel_edit()
+        bbox = self.tree.bbox(iid, column)
+        if not bbox:
+            return  # cell scrolled out of view
+        x, y, width, height = bbox
+        editor = tk.Entry(self.tree, justify="center", relief="solid", bd=1)
+        editor.iid, editor.column = iid, column
+        value = self._rows[iid][self.col_index[column]]
+        editor.insert(0, "" if value is None else value)
+        validator = self.validators.get(column)
+        if validator:
+            vcmd = editor.register(validator)
+            editor.config(validate="key", validatecommand=(vcmd, '%P'))
+        editor.place(x=x, y=y, width=width, height=height)
+        editor.focus_set()
+        editor.select_range(0, tk.END)
+        editor.bind("<Return>", lambda e: self.commit_edit())
+        editor.bind("<KP_Enter>", lambda e: self.commit_edit())
+        editor.bind("<Escape>", lambda e: self.cancel_edit())
+        editor.bind("<FocusOut>", lambda e: self.commit_edit())
+        self._editor = editor
+
+    def commit_edit(self):
+        editor, self._editor = self._editor, None
+        if editor is None:
+            return
+        iid, column = editor.iid, editor.column
+        new_value = editor.get()
+        editor.destroy()
+        if iid not in self._rows:
+            return
+        idx = self.col_index[column]
+        if str(self._rows[iid][idx]) == new_value:
+            return
+        self._rows[iid][idx] = new_value
+        self._refresh(iid)
+        if self.on_edit:
+            self.on_edit(self._ids[iid], column, new_value)
+
+    def cancel_edit(self):
+        editor, self._editor = self._editor, None
+        if editor is not None:
+            editor.destroy()
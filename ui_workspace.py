@@ -38,7 +38,7 @@ def workspace_window(email):
         if win.winfo_exists(): # Check if main window still exists before destroying
             cleanup_window(win)
             win.destroy()
-        conn = db_handler.sqlite3.connect("users.db")
+        conn = db_handler.connect()
         cur = conn.cursor()
         cur.execute("DELETE FROM user_session_counters WHERE user_id = ?", (user_id,))
         conn.commit()
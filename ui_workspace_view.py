@@ -1,46 +1,47 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import db_handler
+from db_handler import status_writes
+import strategy_store
+from status_counters import counters as status_counters
 import json
+import csv
 from instrument_pop import select_instrument
+import instrument_index
+from instrument_store import ENRICHED_FIELDS
 from functools import partial
-from tcp_utils import send_tcp_command
-import threading
+from tcp_utils import send_tcp_command, send_tcp_batch
+from tcp_trace import TRACES
+import ui_dispatch
+from ui_strategy_grid import StrategyGrid
+from datetime import datetime
 from window_utils import center_window, _perform_centering_on_restore, on_configure, cleanup_window 
 
-def get_next_session_id(user_id):
-    conn = db_handler.sqlite3.connect("users.db")
-    cur = conn.cursor()
+def reserve_session_ids(conn, user_id, count):
+    """Take ``count`` consecutive row IDs from the user's counter in one update
+    and return the first. Runs in the caller's transaction, so the IDs are
+    only used up if the rows they were taken for are committed."""
+    conn.execute("INSERT OR IGNORE INTO user_session_counters (user_id, current_id) VALUES (?, 0)", (user_id,))
+    conn.execute("UPDATE user_session_counters SET current_id = COALESCE(current_id, 0) + ? WHERE user_id = ?",
+                 (count, user_id))
+    current_id = conn.execute("SELECT current_id FROM user_session_counters WHERE user_id = ?",
+                              (user_id,)).fetchone()[0]
+    return current_id - count + 1
 
-    # Get current counter
-    cur.execute("SELECT current_id FROM user_session_counters WHERE user_id = ?", (user_id,))
-    row = cur.fetchone()
-    current_id = row[0] if row else 0
-    next_id = current_id + 1
+# Constants
+TABLE_ACTIONS = ["Set Default", "New Table", "Edit Table", "Add Row", "Bulk Add", "Start All", "Stop All"]
+BULK_PAGE_SIZE = 1000  # rows read per page by Start All / Stop All
 
-    # Update counter
-    cur.execute("REPLACE INTO user_session_counters (user_id, current_id) VALUES (?, ?)", (user_id, next_id))
-    conn.commit()
-    conn.close()
+def add_instrument_details(data):
+    """Attach the master's enriched fields for the row's InstrumentToken (lot
+    size, expiry, exchange segment, ...) to an outgoing payload; keys already
+    set win. Token, name and symbol are already in the row."""
+    details = instrument_index.instrument_details(data.get("InstrumentToken"))
+    for key, value in (details or {}).items():
+        if key in ENRICHED_FIELDS:
+            data.setdefault(key, value)
+    return data
 
-    return next_id
-
-# Constants
-TABLE_ACTIONS = ["Set Default", "New Table", "Edit Table", "Add Row", "Start All", "Stop All"]
-
-# Entry point
-def create_validator(data_type):
-    def validate(P):
-        if data_type == "INTEGER":
-            return P == "" or P.isdigit()
-        elif data_type == "FLOAT":
-            try:
-                float(P)
-                return True
-            except ValueError:
-                return P == ""  # Allow empty
-        return True  # TEXT allows anything
-    return validate
 
 # Function to create a new table schema
 def open_create_table_popup(parent, workspace_id, user_id, refresh_callback):
@@ -146,25 +147,9 @@ def open_create_table_popup(parent, workspace_id, user_id, refresh_callback):
                 "editable": is_editable
             })
 
-        conn = db_handler.sqlite3.connect("users.db")
-        cur = conn.cursor()
-        # Create physical table name
-        physical_table_name = f"user_{user_id}_ws_{workspace_id}_{table_name}".replace(" ", "_")
-
-        # Create physical table SQL
-        column_defs = ['"ID" TEXT', '"STRATEGY" TEXT', '"TABLE" TEXT', '"STATUS" TEXT', '"InstrumentToken" TEXT', '"InstrumentID" TEXT', '"InstrumentName" TEXT']
-        for col in schema:
-            column_defs.append(f'"{col["name"]}" {col["type"]}')
-
-        create_sql = f"CREATE TABLE IF NOT EXISTS {physical_table_name} ({', '.join(column_defs)})"
-        cur.execute(create_sql)
-
-        # Save the table schema and metadata
-        cur.execute("""
-            INSERT INTO user_tables (user_id, workspace_id, table_name, schema, physical_table_name, is_default)
-            VALUES (?, ?, ?, ?, ?, 0)
-        """, (user_id, workspace_id, table_name, json.dumps(schema), physical_table_name))
-
+        conn = db_handler.connect()
+        # Save the table schema and metadata, and create its storage
+        strategy_store.create_table(conn, user_id, workspace_id, table_name, schema)
         conn.commit()
         conn.close()
 
@@ -176,19 +161,12 @@ def open_create_table_popup(parent, workspace_id, user_id, refresh_callback):
 
 # Function to edit table schema
 def open_edit_table_popup(parent, workspace_id, user_id, old_table_name, refresh_callback):
-    conn = db_handler.sqlite3.connect("users.db")
-    cur = conn.cursor()
-    cur.execute("SELECT schema FROM user_tables WHERE user_id=? AND workspace_id=? AND table_name=?",
-                (user_id, workspace_id, old_table_name))
-    result = cur.fetchone()
-
-    if not result:
-        conn.close()
+    table = strategy_store.lookup(None, user_id, workspace_id, old_table_name)
+    if not table:
         messagebox.showerror("Error", "Table not found.")
         return
 
-    schema_data = json.loads(result[0])
-    conn.close()
+    schema_data = table.schema
 
     popup = tk.Toplevel(parent)
     popup.title(f"Edit Table - {old_table_name}")
@@ -258,7 +236,7 @@ def open_edit_table_popup(parent, workspace_id, user_id, old_table_name, refresh
             messagebox.showerror("Error", "Table name cannot be empty.")
             return
 
-        conn = db_handler.sqlite3.connect("users.db")
+        conn = db_handler.connect()
         cur = conn.cursor()
 
         # Check for name conflict if changed
@@ -279,6 +257,7 @@ def open_edit_table_popup(parent, workspace_id, user_id, old_table_name, refresh
             is_editable = bool(editable.get())
 
             if not col_name:
+                conn.close()
                 messagebox.showerror("Error", "Column name cannot be empty.")
                 return
 
@@ -294,6 +273,7 @@ def open_edit_table_popup(parent, workspace_id, user_id, old_table_name, refresh
                     (new_table_name, json.dumps(new_schema), user_id, workspace_id, old_table_name))
         conn.commit()
         conn.close()
+        strategy_store.invalidate(user_id, workspace_id, old_table_name)
 
         popup.destroy()
         refresh_callback()
@@ -303,8 +283,12 @@ def open_edit_table_popup(parent, workspace_id, user_id, old_table_name, refresh
         if not confirm:
             return
 
-        conn = db_handler.sqlite3.connect("users.db")
+        conn = db_handler.connect()
         cur = conn.cursor()
+        table = strategy_store.lookup(conn, user_id, workspace_id, old_table_name)
+        if table:
+            strategy_store.drop_table(conn, table)
+            status_counters.forget(table)
         cur.execute("DELETE FROM user_tables WHERE user_id=? AND workspace_id=? AND table_name=?",
                     (user_id, workspace_id, old_table_name))
         conn.commit()
@@ -318,56 +302,57 @@ def open_edit_table_popup(parent, workspace_id, user_id, old_table_name, refresh
     tk.Button(btn_frame, text="Save Changes", command=save_changes, bg="blue", fg="white").pack(side="left", padx=5)
     tk.Button(btn_frame, text="Delete Table", command=delete_table, bg="red", fg="white").pack(side="left", padx=5)
 
+def build_strategy_row(table, row_id, name, symbol, token):
+    """A new INACTIVE row of ``table`` for an instrument, with the schema's defaults."""
+    row = {
+        "ID": str(row_id),
+        "Strategy": f"{table.table_name}_{row_id}",
+        "Table": table.table_name.upper(),
+        "STATUS": "INACTIVE",
+        "InstrumentToken": str(token),
+        "InstrumentID": symbol,
+        "InstrumentName": name,
+    }
+
+    # Add user-defined columns with defaults; columns named after an
+    # instrument field (e.g. LOT_SIZE, EXPIRY) start from the master's value
+    details = instrument_index.instrument_details(token) or {}
+    instrument_values = {key.replace("_", "").lower(): value for key, value in details.items()}
+    for col in table.schema:
+        if col["name"] not in row:
+            row[col["name"]] = instrument_values.get(col["name"].replace("_", "").lower(), col["default"])
+    return row
+
+def add_strategy_rows(conn, user_id, table, instruments):
+    """Insert one row per (name, symbol, token) in a single transaction: one
+    block of IDs, one executemany. Returns the new rows."""
+    if not instruments:
+        return []
+    first_id = reserve_session_ids(conn, user_id, len(instruments))
+    rows = [build_strategy_row(table, first_id + i, name, symbol, token)
+            for i, (name, symbol, token) in enumerate(instruments)]
+    try:
+        strategy_store.insert_rows(conn, table, rows)
+        conn.commit()
+    except db_handler.sqlite3.Error:
+        conn.rollback()
+        raise
+    status_counters.rows_added(table, [row["ID"] for row in rows])
+    return rows
+
 #Function to handle add row functionality in the table
 def handle_add_row(user_id, workspace_id, table_name, refresh_callback):
     def after_instrument_selected(name, symbol, token):
         # Fetch existing table schema
-        conn = db_handler.sqlite3.connect("users.db")
-        cur = conn.cursor()
-        cur.execute("SELECT schema, physical_table_name FROM user_tables WHERE user_id=? AND workspace_id=? AND table_name=?",
-                    (user_id, workspace_id, table_name))
-        result = cur.fetchone()
-        if not result:
+        conn = db_handler.connect()
+        table = strategy_store.lookup(conn, user_id, workspace_id, table_name)
+        if not table:
             conn.close()
             messagebox.showerror("Error", "Table not found.")
             return
 
-        schema = json.loads(result[0])
-        physical_table = result[1]
-
-        next_id = get_next_session_id(user_id)
-        print("The next global user-based ID is:", next_id)
-
-
-        print("The next unique ID for the new row is:", next_id) # For debugging/verification
-        # --- END OF CRITICAL CHANGE FOR ID GENERATION ---
-
-        # Create new row with the unique ID
-        new_row = {
-            "ID": str(next_id),  # Use the newly generated unique ID
-            "Strategy": f"{table_name}_{next_id}", # Update Strategy to use the new unique ID
-            "Table": table_name.upper(),
-            "STATUS": "INACTIVE",
-            "InstrumentToken": str(token),
-            "InstrumentID": symbol,
-            "InstrumentName": name,
-        }
-
-        # Add user-defined columns with defaults
-        for col in schema:
-            if col["name"] not in new_row:
-                new_row[col["name"]] = col["default"]
-
-        # Build insert SQL
-        columns = list(new_row.keys())
-        placeholders = ",".join("?" for _ in columns)
-        # It's good practice to quote column names to avoid issues with reserved keywords
-        quoted_columns = ', '.join(f'"{col}"' for col in columns)
-        insert_sql = f"INSERT INTO {physical_table} ({quoted_columns}) VALUES ({placeholders})"
-        
         try:
-            cur.execute(insert_sql, [new_row[col] for col in columns])
-            conn.commit()
+            add_strategy_rows(conn, user_id, table, [(name, symbol, token)])
             messagebox.showinfo("Success", "Row added successfully!")
             # This line ensures you stay on the correct table after adding a row
             refresh_callback(table_name)
@@ -379,11 +364,180 @@ def handle_add_row(user_id, workspace_id, table_name, refresh_callback):
     # Open instrument selection popup
     select_instrument(after_instrument_selected)
 
+_CSV_HEADERS = {
+    "token": "token", "instrumenttoken": "token",
+    "symbol": "symbol", "instrumentid": "symbol",
+    "name": "name", "instrumentname": "name",
+}
+
+def parse_instrument_list(text, index):
+    """Resolve pasted lines or CSV rows to instruments.
+
+    Each line is a token, an exact instrument name, or CSV cells such as
+    "token,symbol,name" or "symbol,name". A header row naming Token, Symbol
+    or Name columns (InstrumentToken/InstrumentID/InstrumentName work too)
+    picks those columns. An instrument listed more than once is kept once.
+    Returns ([(name, symbol, token), ...], [unmatched line, ...], [duplicate line, ...]).
+    """
+    found, unmatched, duplicates = [], [], []
+    seen = set()  # tokens already in found
+    columns = None
+    for cells in csv.reader(text.splitlines()):
+        cells = [cell.strip() for cell in cells]
+        if not any(cells):
+            continue
+        keys = [_CSV_HEADERS.get(cell.replace("_", "").replace(" ", "").lower()) for cell in cells]
+        if columns is None and not found and not unmatched and not duplicates and any(keys):
+            columns = {key: i for i, key in enumerate(keys) if key}
+            continue
+
+        if columns:
+            named = {key: cells[i] for key, i in columns.items() if i < len(cells)}
+            instrument = None
+            if named.get("token"):
+                instrument = index.find_token(named["token"])
+            if instrument is None and named.get("symbol") and named.get("name"):
+                instrument = index.find(named["symbol"], named["name"])
+            if instrument is None and named.get("name"):
+                instrument = index.resolve(named["name"])
+        else:
+            instrument = next(filter(None, map(index.find_token, filter(str.isdigit, cells))), None)
+            if instrument is None and len(cells) >= 2:
+                instrument = index.find(cells[0], cells[1])
+            if instrument is None:
+                instrument = index.resolve(",".join(cells))
+        if instrument is None:
+            unmatched.append(",".join(cells))
+        elif instrument[2] in seen:
+            duplicates.append(",".join(cells))
+        else:
+            seen.add(instrument[2])
+            found.append(instrument)
+    return found, unmatched, duplicates
+
+#Function to add many rows at once (from search, a paste or a CSV file)
+def handle_bulk_add_rows(parent, user_id, workspace_id, table_name, refresh_callback):
+    if not table_name:
+        messagebox.showerror("Error", "Select a table first.")
+        return
+    if not instrument_index.ready.is_set():
+        messagebox.showinfo("Loading", "The instrument list is still loading. Please try again in a moment.")
+        return
+    index = instrument_index.get_index()
+
+    popup = tk.Toplevel(parent)
+    popup.title(f"Bulk Add Rows - {table_name}")
+    popup.geometry("600x560")
+
+    # Search and multi-select: selected instruments are appended to the list below
+    tk.Label(popup, text="Search (e.g. nifty 25 jun ce), select one or more results:").pack(anchor="w", padx=10, pady=(10, 0))
+    search_var = tk.StringVar()
+    search_entry = tk.Entry(popup, textvariable=search_var)
+    search_entry.pack(fill="x", padx=10)
+    results_box = tk.Listbox(popup, selectmode="extended", height=8)
+    results_box.pack(fill="x", padx=10, pady=5)
+    results = []
+
+    def on_search_keyrelease(event):
+        results[:] = index.search(search_var.get())
+        results_box.delete(0, "end")
+        for name, symbol, token in results:
+            results_box.insert("end", f"{name}  ({symbol} · {token})")
+
+    def add_selected():
+        for i in results_box.curselection():
+            name, symbol, token = results[i]
+            text_box.insert("end", f"{token},{symbol},{name}\n")
+        update_count()
+
+    search_entry.bind("<KeyRelease>", on_search_keyrelease)
+    tk.Button(popup, text="Add Selected", command=add_selected).pack(anchor="w", padx=10)
+
+    tk.Label(popup, text="Instruments, one per line (token, exact name, or CSV: token,symbol,name):").pack(anchor="w", padx=10, pady=(10, 0))
+    text_frame = tk.Frame(popup)
+    text_frame.pack(fill="both", expand=True, padx=10, pady=5)
+    text_box = tk.Text(text_frame, height=10, wrap="none")
+    scrollbar = tk.Scrollbar(text_frame, command=text_box.yview)
+    text_box.configure(yscrollcommand=scrollbar.set)
+    scrollbar.pack(side="right", fill="y")
+    text_box.pack(side="left", fill="both", expand=True)
+
+    count_label = tk.Label(popup, text="0 lines")
+    count_label.pack(anchor="w", padx=10)
+
+    def update_count(event=None):
+        lines = sum(1 for line in text_box.get("1.0", "end").splitlines() if line.strip())
+        count_label.config(text=f"{lines} lines")
+
+    text_box.bind("<KeyRelease>", update_count)
+
+    def import_csv():
+        path = filedialog.askopenfilename(parent=popup, title="Import instruments",
+                                          filetypes=[("CSV files", "*.csv"), ("Text files", "*.txt"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            with open(path, newline="", encoding="utf-8-sig") as f:
+                text_box.insert("end", f.read().rstrip("\n") + "\n")
+        except (OSError, UnicodeDecodeError) as e:
+            messagebox.showerror("Import Failed", f"Could not read {path}: {e}", parent=popup)
+        update_count()
+
+    def add_rows():
+        instruments, unmatched, duplicates = parse_instrument_list(text_box.get("1.0", "end"), index)
+
+        def listing(lines):
+            return "\n".join(lines[:10]) + ("\n..." if len(lines) > 10 else "")
+
+        if unmatched and not instruments:
+            messagebox.showerror("No Instruments", f"No line matched an instrument:\n\n{listing(unmatched)}",
+                                 parent=popup)
+            return
+        if unmatched or duplicates:
+            problems = []
+            if unmatched:
+                problems.append(f"{len(unmatched)} line(s) did not match an instrument:\n\n{listing(unmatched)}")
+            if duplicates:
+                problems.append(f"{len(duplicates)} line(s) repeat an instrument already listed and will be "
+                                f"skipped:\n\n{listing(duplicates)}")
+            if not messagebox.askyesno("Check Instruments", "\n\n".join(problems) +
+                                       f"\n\nAdd {len(instruments)} row(s), one per instrument?", parent=popup):
+                return
+        if not instruments:
+            return
+
+        conn = db_handler.connect()
+        try:
+            table = strategy_store.lookup(conn, user_id, workspace_id, table_name)
+            if not table:
+                messagebox.showerror("Error", "Table not found.", parent=popup)
+                return
+            rows = add_strategy_rows(conn, user_id, table, instruments)
+        except db_handler.sqlite3.Error as e:
+            messagebox.showerror("Database Error", f"Failed to add rows: {e}", parent=popup)
+            return
+        finally:
+            conn.close()
+
+        print(f"➕ Added {len(rows)} rows to {table_name} (IDs {rows[0]['ID']}-{rows[-1]['ID']})")
+        popup.destroy()
+        refresh_callback(table_name)
+        messagebox.showinfo("Success", f"{len(rows)} rows added successfully!")
+
+    btn_frame = tk.Frame(popup)
+    btn_frame.pack(pady=10)
+    tk.Button(btn_frame, text="Import CSV...", command=import_csv).pack(side="left", padx=5)
+    tk.Button(btn_frame, text="Add Rows", command=add_rows, bg="#22c55e", fg="white").pack(side="left", padx=5)
+    tk.Button(btn_frame, text="Cancel", command=popup.destroy).pack(side="left", padx=5)
+    search_entry.focus_set()
+
 def open_workspace_layout(workspace_id, email, master_win=None, on_close_callback=None):
 
     user_id = db_handler.get_user_id(email)
     workspace = db_handler.get_workspace_by_id(workspace_id)
-    entry_widgets_by_row_id = {}
+    grid = None  # StrategyGrid of the table on screen
+    grid_table = None  # TableRef the grid was drawn from
+    grid_version = 0  # change-log version of grid_table when it was last synced
     name, theme, icon = workspace
 
     bg_color = "#ffffff" if theme == "light" else "#111111"
@@ -391,6 +545,8 @@ def open_workspace_layout(workspace_id, email, master_win=None, on_close_callbac
 
     win = tk.Toplevel(master=master_win)
     win.title(name)
+    # TCP callbacks are marshalled onto this Tk loop and drained in batches
+    ui = ui_dispatch.install(win._root())
     win.attributes("-fullscreen", True)
 
     center_window(win)
@@ -400,21 +556,19 @@ def open_workspace_layout(workspace_id, email, master_win=None, on_close_callbac
     # MODIFIED: on_workspace_close now calls the provided callback
     def on_workspace_close():
         print("🔒 Attempting to close workspace...")
-        conn = db_handler.sqlite3.connect("users.db")
-        cur = conn.cursor()
-        cur.execute("SELECT table_name, physical_table_name FROM user_tables WHERE user_id=? AND workspace_id=?", (user_id, workspace_id))
-        tables = cur.fetchall()
+        status_writes.flush()
+        conn = db_handler.connect()
+        tables = strategy_store.tables_for_workspace(conn, user_id, workspace_id)
 
         active_tables = []
-        for logical_name, physical_name in tables:
+        for table in tables:
             try:
-                cur.execute(f"SELECT COUNT(*) FROM {physical_name} WHERE UPPER(STATUS)='ACTIVE'")
-                count = cur.fetchone()[0]
-                print(f"Table {logical_name} has {count} active strategies")
+                count, _ = status_counters.get(table)
+                print(f"Table {table.table_name} has {count} active strategies")
                 if count > 0:
-                    active_tables.append(logical_name)
+                    active_tables.append(table.table_name)
             except Exception as e:
-                print(f"❌ Failed to check {physical_name}: {e}")
+                print(f"❌ Failed to check {table.table_name}: {e}")
                 continue
 
         conn.close()
@@ -466,66 +620,40 @@ def open_workspace_layout(workspace_id, email, master_win=None, on_close_callbac
     content_frame.pack(fill="both", expand=True, padx=20, pady=10)
 
     def update_row_ui_waiting(row_id):
-        widgets = entry_widgets_by_row_id.get(row_id)
-        if widgets:
-            if "STATUS" in widgets:
-                widgets["STATUS"].config(state='normal')
-                widgets["STATUS"].delete(0, tk.END)
-                widgets["STATUS"].insert(0, "WAITING")
-                widgets["STATUS"].config(state='readonly', background="#fcd34d")  # Yellow color for waiting
-            if "ID" in widgets:
-                widgets["ID"].config(state='normal', background="#fcd34d") 
-                widgets["ID"].config(state='readonly')
-            if "SELECTED" in widgets:
-                widgets["SELECTED"].set(1)
-            if "CHECKBOX_WIDGET" in widgets: # <--- ADD THIS BLOCK
-                widgets["CHECKBOX_WIDGET"].config(bg=bg_color)
+        if grid is not None:
+            grid.set_status(row_id, "WAITING")
 
     def update_row_ui_active(row_id):
-            widgets = entry_widgets_by_row_id.get(row_id)
-            if widgets:
-                if "STATUS" in widgets:
-                    widgets["STATUS"].config(state='normal')
-                    widgets["STATUS"].delete(0, tk.END)
-                    widgets["STATUS"].insert(0, "ACTIVE")
-                    widgets["STATUS"].config(state='readonly', background="#c7f9cc")
-                if "ID" in widgets:
-                    widgets["ID"].config(state='normal')
-                    widgets["ID"].config(readonlybackground="#c7f9cc")
-                    widgets["ID"].config(state='readonly')
-                if "SELECTED" in widgets:
-                    widgets["SELECTED"].set(1)
-                if "CHECKBOX_WIDGET" in widgets:
-                    widgets["CHECKBOX_WIDGET"].config(bg="#c7f9cc")
-                if "apply_btn" in widgets:
-                    widgets["apply_btn"].config(state="disabled")
-                if "delete_btn" in widgets:
-                    widgets["delete_btn"].config(state="disabled")
-                if "stop_btn" in widgets:
-                    widgets["stop_btn"].config(state="normal")
+        if grid is not None:
+            grid.set_status(row_id, "ACTIVE")
 
     def update_row_ui_inactive(row_id):
-        widgets = entry_widgets_by_row_id.get(row_id)
-        if widgets:
-            if "STATUS" in widgets:
-                widgets["STATUS"].config(state='normal')
-                widgets["STATUS"].delete(0, tk.END)
-                widgets["STATUS"].insert(0, "INACTIVE")
-                widgets["STATUS"].config(state='readonly', background="white")  # Set background to white
-            if "ID" in widgets:
-                widgets["ID"].config(state='normal')
-                widgets["ID"].config(readonlybackground="white")  # Set background to white
-                widgets["ID"].config(state='readonly')
-            if "SELECTED" in widgets:
-                widgets["SELECTED"].set(0)  # Deselect if needed
-            if "CHECKBOX_WIDGET" in widgets: 
-                widgets["CHECKBOX_WIDGET"].config(bg=bg_color)
-            if "apply_btn" in widgets:
-                widgets["apply_btn"].config(state="normal")
-            if "delete_btn" in widgets:
-                widgets["delete_btn"].config(state="normal")
-            if "stop_btn" in widgets:
-                widgets["stop_btn"].config(state="disabled")
+        if grid is not None:
+            grid.set_status(row_id, "INACTIVE")
+
+    def build_row_payload(col_names, row):
+        data = dict(zip(col_names, row))
+        data.update({
+            "strategy_name": data.get("STRATEGY", ""),
+            "table_type": data.get("TABLE", "").lower(),
+            "instrument_id": data.get("InstrumentID", ""),
+            "instrument_name": data.get("InstrumentName", ""),
+            "status": data.get("STATUS", ""),
+            "user_id": user_id,
+            "workspace_id": workspace_id,
+            "row_id": data.get("ID", "")
+        })
+        return add_instrument_details(data)
+
+    def record_status(table, row_id, status):
+        # Counters move now; the DB write is batched until the next flush
+        status_writes.set_status(table, row_id, status)
+        status_counters.set_status(table, row_id, status)
+
+    def show_batch_errors(errors):
+        if errors:
+            more = f"\n\n(+{len(errors) - 1} more)" if len(errors) > 1 else ""
+            messagebox.showerror("TCP Error", f"❌ {errors[0]}{more}")
 
     def handle_start_all():
         table_name = table_var.get()
@@ -533,72 +661,46 @@ def open_workspace_layout(workspace_id, email, master_win=None, on_close_callbac
             messagebox.showerror("Error", "No table selected.")
             return
 
-        conn = db_handler.sqlite3.connect("users.db")
-        cur = conn.cursor()
-        cur.execute("SELECT schema, physical_table_name FROM user_tables WHERE user_id=? AND workspace_id=? AND table_name=?",
-                    (user_id, workspace_id, table_name))
-        result = cur.fetchone()
-        if not result:
+        conn = db_handler.connect()
+        table = strategy_store.lookup(conn, user_id, workspace_id, table_name)
+        if not table:
+            conn.close()
             messagebox.showerror("Error", "Table not found.")
             return
 
-        schema = json.loads(result[0])
-        physical_table = result[1]
-
-        cur.execute(f"SELECT * FROM {physical_table}")
-        rows = cur.fetchall()
-        col_names = [desc[0] for desc in cur.description]
-        conn.close()
-
-        total = len(rows)
-        done = [0]  # mutable counter
-
-        # Loop through each row and update it to 'WAITING'
-        for row in rows:
-            row_id = row[col_names.index("ID")]  # Assuming "ID" is the first column in schema
-            status_value = row[col_names.index("STATUS")].upper()
-
-            # Call the update_row_ui_waiting before sending the command
-            if status_value != "ACTIVE":
-                update_row_ui_waiting(row_id)
-
-            data = dict(zip(col_names, row))
-            data.update({
-                "strategy_name": data.get("STRATEGY", ""),
-                "table_type": data.get("TABLE", "").lower(),
-                "instrument_id": data.get("InstrumentID", ""),
-                "instrument_name": data.get("InstrumentName", ""),
-                "status": data.get("STATUS", ""),
-                "user_id": user_id,
-                "workspace_id": workspace_id,
-                "row_id": data.get("ID", "")
-            })
-
-            command = {
-                "action": "apply_strategy",
-                "data": data
-            }
-
-            def callback(resp, row_id=data["row_id"]):
-                if resp.get("status") == "success":
-                    conn2 = db_handler.sqlite3.connect("users.db")
-                    cur2 = conn2.cursor()
-                    cur2.execute(f"UPDATE {physical_table} SET STATUS = 'ACTIVE' WHERE ID = ?", (row_id,))
-                    conn2.commit()
-                    conn2.close()
+        # One apply_strategies frame per chunk, results come back per row
+        def callback(resp, chunk):
+            results = {str(r.get("row_id")): r for r in resp.get("results", [])}
+            errors = []
+            for data in chunk:
+                row_id = data["row_id"]
+                row_result = results.get(str(row_id), resp)
+                if row_result.get("status") == "success":
+                    record_status(table, row_id, "ACTIVE")
                     update_row_ui_active(row_id)  # Update the row to ACTIVE
                 else:
-                    messagebox.showerror("TCP Error", f"❌ {resp.get('message')}")
-                    conn2 = db_handler.sqlite3.connect("users.db")
-                    cur2 = conn2.cursor()
-                    cur2.execute(f"UPDATE {physical_table} SET STATUS = 'INACTIVE' WHERE ID = ?", (row_id,))
-                    conn2.commit()
-                    conn2.close()
+                    errors.append(row_result.get("message"))
+                    record_status(table, row_id, "INACTIVE")
                     update_row_ui_inactive(row_id)  # Update the row to INACTIVE
 
-                update_strategy_status_display()
+            show_batch_errors(errors)
+            ui.coalesce(status_writes.flush)
+            ui.coalesce(update_strategy_status_display)
 
-            send_tcp_command(command, callback=callback)
+        # Stream the table a page at a time straight into the TCP sender
+        try:
+            for col_names, rows in strategy_store.iter_pages(conn, table, BULK_PAGE_SIZE):
+                payloads = []
+                for row in rows:
+                    data = build_row_payload(col_names, row)
+
+                    # Mark the row as WAITING before sending the command
+                    if str(data.get("STATUS", "")).upper() != "ACTIVE":
+                        update_row_ui_waiting(data["row_id"])
+                    payloads.append(data)
+                send_tcp_batch("apply_strategies", payloads, callback=callback)
+        finally:
+            conn.close()
 
     def handle_stop_all():
         table_name = table_var.get()
@@ -606,74 +708,48 @@ def open_workspace_layout(workspace_id, email, master_win=None, on_close_callbac
             messagebox.showerror("Error", "No table selected.")
             return
 
-        conn = db_handler.sqlite3.connect("users.db")
-        cur = conn.cursor()
-        cur.execute("SELECT schema, physical_table_name FROM user_tables WHERE user_id=? AND workspace_id=? AND table_name=?",
-                    (user_id, workspace_id, table_name))
-        result = cur.fetchone()
-        if not result:
+        conn = db_handler.connect()
+        table = strategy_store.lookup(conn, user_id, workspace_id, table_name)
+        if not table:
+            conn.close()
             messagebox.showerror("Error", "Table not found.")
             return
 
-        schema = json.loads(result[0])
-        physical_table = result[1]
-
-        cur.execute(f"SELECT * FROM {physical_table}")
-        rows = cur.fetchall()
-        col_names = [desc[0] for desc in cur.description]
-        conn.close()
-
-        total = len(rows)
-        done = [0]  # mutable counter
-
-        # Loop through each row and update it to 'WAITING'
-        for row in rows:
-            row_id = row[col_names.index("ID")]  # Assuming "ID" is the first column in schema
-            status_value = row[col_names.index("STATUS")].upper()
-
-        # Only set 'WAITING' if transitioning from 'ACTIVE' to 'INACTIVE'
-            if status_value != "INACTIVE":
-                update_row_ui_waiting(row_id)
-
-            data = dict(zip(col_names, row))
-            data.update({
-                "strategy_name": data.get("STRATEGY", ""),
-                "table_type": data.get("TABLE", "").lower(),
-                "instrument_id": data.get("InstrumentID", ""),
-                "instrument_name": data.get("InstrumentName", ""),
-                "status": data.get("STATUS", ""),
-                "user_id": user_id,
-                "workspace_id": workspace_id,
-                "row_id": data.get("ID", "")
-            })
-
-            command = {
-                "action": "stop_strategy",
-                "data": data
-            }
-
-            # Callback function to execute after sending stop command
-            def callback(resp, row_id=data["row_id"]):
-                if resp.get("status") == "success":
-                    # No need to show success popup as we are directly updating the status
-                    conn2 = db_handler.sqlite3.connect("users.db")
-                    cur2 = conn2.cursor()
-                    cur2.execute(f"UPDATE {physical_table} SET STATUS = 'INACTIVE' WHERE ID = ?", (row_id,))
-                    conn2.commit()
-                    conn2.close()
+        # Callback function to execute after each stop_strategies chunk
+        def callback(resp, chunk):
+            results = {str(r.get("row_id")): r for r in resp.get("results", [])}
+            errors = []
+            for data in chunk:
+                row_id = data["row_id"]
+                row_result = results.get(str(row_id), resp)
+                if row_result.get("status") == "success":
+                    record_status(table, row_id, "INACTIVE")
                     update_row_ui_inactive(row_id)  # Update the row to INACTIVE
                 else:
-                    messagebox.showerror("TCP Error", f"❌ {resp.get('message')}")
-                    update_row_ui_active(row_id) 
+                    errors.append(row_result.get("message"))
+                    update_row_ui_active(row_id)
 
-                done[0] += 1
-                if done[0] == total:
-                    update_strategy_status_display()
+            show_batch_errors(errors)
+            ui.coalesce(status_writes.flush)
+            ui.coalesce(update_strategy_status_display)
 
-            threading.Thread(target=lambda: send_tcp_command(command, callback=callback)).start()
+        # Stream the table a page at a time straight into the TCP sender
+        try:
+            for col_names, rows in strategy_store.iter_pages(conn, table, BULK_PAGE_SIZE):
+                payloads = []
+                for row in rows:
+                    data = build_row_payload(col_names, row)
+
+                    # Only set 'WAITING' if transitioning from 'ACTIVE' to 'INACTIVE'
+                    if str(data.get("STATUS", "")).upper() != "INACTIVE":
+                        update_row_ui_waiting(data["row_id"])
+                    payloads.append(data)
+                send_tcp_batch("stop_strategies", payloads, callback=callback)
+        finally:
+            conn.close()
 
     def set_default_table(table_name):
-        conn = db_handler.sqlite3.connect("users.db")
+        conn = db_handler.connect()
         cur = conn.cursor()
         cur.execute("UPDATE user_tables SET is_default=0 WHERE user_id=? AND workspace_id=?", (user_id, workspace_id))
         cur.execute("UPDATE user_tables SET is_default=1 WHERE user_id=? AND workspace_id=? AND table_name=?",
@@ -683,8 +759,9 @@ def open_workspace_layout(workspace_id, email, master_win=None, on_close_callbac
         messagebox.showinfo("Default Table", f"'{table_name}' set as default.")
 
     def update_table_display(table_name):
-        nonlocal entry_widgets_by_row_id
-        entry_widgets_by_row_id.clear()
+        nonlocal grid, grid_table, grid_version
+        status_writes.flush()  # render what the buffered callbacks already decided
+        grid = grid_table = None
         for widget in content_frame.winfo_children():
             widget.destroy()
 
@@ -693,23 +770,18 @@ def open_workspace_layout(workspace_id, email, master_win=None, on_close_callbac
                     font=("Arial", 14), bg=bg_color, fg=fg_color).pack(expand=True)
             return
         
-        # Get physical table name
-        conn = db_handler.sqlite3.connect("users.db")
-        cur = conn.cursor()
-        cur.execute("SELECT physical_table_name FROM user_tables WHERE user_id=? AND workspace_id=? AND table_name=?",
-                    (user_id, workspace_id, table_name))
-        result = cur.fetchone()
-        if not result:
+        # Look up where the group's rows live
+        conn = db_handler.connect()
+        table = strategy_store.lookup(conn, user_id, workspace_id, table_name)
+        if not table:
             conn.close()
             tk.Label(content_frame, text="Error loading table.", font=("Arial", 12), bg=bg_color, fg="red").pack()
             return
 
-        physical_table = result[0]
-
         try:
-            cur.execute(f"SELECT * FROM {physical_table}")
-            rows = cur.fetchall()
-            col_names = [desc[0] for desc in cur.description]
+            # Version first: anything written while we read is picked up by the next sync
+            version = strategy_store.changes.version(table)
+            col_names = strategy_store.column_names(conn, table)
             conn.close()
         except Exception as e:
             conn.close()
@@ -721,308 +793,169 @@ def open_workspace_layout(workspace_id, email, master_win=None, on_close_callbac
                         bg=bg_color, fg=fg_color)
         header.pack(anchor="center", pady=(0, 10))
 
-        # Table area (scrollable)
-        table_canvas = tk.Canvas(content_frame, bg=bg_color)
-        table_scroll = ttk.Scrollbar(content_frame, orient="vertical", command=table_canvas.yview)
-        table_scroll.pack(side="right", fill="y")
-
-        table_scroll_hori = ttk.Scrollbar(content_frame, orient="horizontal", command=table_canvas.xview)
-        table_scroll_hori.pack(side="bottom", fill="x")
-
-        scroll_frame = tk.Frame(table_canvas, bg=bg_color)
-
-        scroll_frame.bind("<Configure>", lambda e: table_canvas.configure(scrollregion=table_canvas.bbox("all")))
-        table_canvas.create_window((0, 0), window=scroll_frame, anchor="nw")
-        
-        table_canvas.configure(yscrollcommand=table_scroll.set)
-        table_canvas.configure(xscrollcommand=table_scroll_hori.set)
-
-        table_canvas.pack(side="left", fill="both", expand=True)
-
-         # Fetch schema to identify editable fields
-        cur = db_handler.sqlite3.connect("users.db").cursor()
-        cur.execute("SELECT schema FROM user_tables WHERE user_id=? AND workspace_id=? AND table_name=?", 
-                    (user_id, workspace_id, table_name))
-        schema_data = json.loads(cur.fetchone()[0])
-        conn.close()
+        def save_edit(row_id, col, new_value):
+            conn2 = db_handler.connect()
+            try:
+                strategy_store.update_field(conn2, table, row_id, col, new_value)
+                conn2.commit()
+            except Exception as ex:
+                print(f"❌ DB Update Error for {col}, ID={row_id}: {ex}")
+            finally:
+                conn2.close()
+
+        def apply(row_id):
+            # Show "WAITING" immediately when Apply is clicked
+            update_row_ui_waiting(row_id)
+
+            data = {col: str(val) for col, val in grid.row_data(row_id).items()}
+            data["strategy_name"] = data.get("STRATEGY", "")
+            data["table_type"] = data.get("TABLE", "").lower()
+            data["instrument_id"] = data.get("InstrumentID", "")
+            data["instrument_name"] = data.get("InstrumentName", "")
+            data["status"] = data.get("STATUS", "")
+            data["row_id"] = row_id
+            data["user_id"] = user_id
+            data["workspace_id"] = workspace_id
+            add_instrument_details(data)
+
+            # Build the TCP request
+            command = {
+                "action": "apply_strategy",
+                "data": data
+            }
 
-        editable_cols = set(col["name"] for col in schema_data if col["editable"])
-        col_indices = {name: idx for idx, name in enumerate(col_names)}
+            # Callback to update UI after TCP response
+            def on_response(response):
+                if response.get("status") == "success":
+                    
+                    update_row_ui_active(row_id)  # Update the row to ACTIVE
+                    # Update database status to ACTIVE
+                    record_status(table, row_id, "ACTIVE")
 
-        # Draw header row with color-coded labels
-        for col_idx, col_name in enumerate(col_names):
-            is_editable = col_name in editable_cols
-            header_color = "yellow" if is_editable else "blue"
-            tk.Label(scroll_frame, text=col_name, font=("Arial", 10, "bold"),
-                    fg=header_color, bg="#1f2937", borderwidth=1, relief="solid", width=15).grid(row=0, column=col_idx, sticky="nsew")
+                else:
+                    messagebox.showerror("TCP Error", f"❌ {response.get('message')}")
+                    update_row_ui_inactive(row_id)  # Update the row to INACTIVE
 
-        # Add headers for action buttons
-        tk.Label(scroll_frame, text="Apply", font=("Arial", 10, "bold"),
-                bg="#d9d9d9", borderwidth=1, relief="solid", width=10).grid(row=0, column=len(col_names)+1, sticky="nsew")
+                ui.coalesce(status_writes.flush)
+                ui.coalesce(update_strategy_status_display)
+            send_tcp_command(command, callback=on_response)
 
-        tk.Label(scroll_frame, text="Stop", font=("Arial", 10, "bold"),
-                bg="#d9d9d9", borderwidth=1, relief="solid", width=10).grid(row=0, column=len(col_names)+2, sticky="nsew")
+        def stop(row_id):
+            # Show "WAITING" immediately when Stop is clicked
+            update_row_ui_waiting(row_id)
 
-        tk.Label(scroll_frame, text="Delete", font=("Arial", 10, "bold"),
-         bg="#d9d9d9", borderwidth=1, relief="solid", width=10).grid(row=0, column=len(col_names)+3, sticky="nsew")
+            data = {col: str(val) for col, val in grid.row_data(row_id).items()}
+            data["row_id"] = row_id
+            data["table_type"] = data.get("TABLE", "").lower()
+            data["user_id"] = user_id
+            data["workspace_id"] = workspace_id
+            add_instrument_details(data)
 
-        # Fetch schema to identify editable fields
-        cur = db_handler.sqlite3.connect("users.db").cursor()
-        cur.execute("SELECT schema FROM user_tables WHERE user_id=? AND workspace_id=? AND table_name=?", 
-                    (user_id, workspace_id, table_name))
-        schema_data = json.loads(cur.fetchone()[0])
-        conn.close()
+            command = {
+                "action": "stop_strategy",
+                "data": data
+            }
 
-        editable_cols = set(col["name"] for col in schema_data if col["editable"])
-        col_indices = {name: idx for idx, name in enumerate(col_names)}
+            def on_response(response):
+                if response.get("status") == "success":
+                    update_row_ui_inactive(row_id)  # Update the row to INACTIVE
+                    # Update database status to INACTIVE
+                    record_status(table, row_id, "INACTIVE")
 
-        for row_idx, row_data in enumerate(rows, start=1):
-            row_bg = "#f9fafb" if row_idx % 2 == 0 else "#e5e7eb"
-            row_widgets = {}
-            row_id = row_data[col_indices.get("ID")]
-            
-            # Add checkbox for selection
-            status_value = str(row_data[col_indices.get("STATUS", -1)]).upper()
-            selected_var = tk.IntVar(value=1 if status_value == "ACTIVE" else 0)
-            cb_color = "#bbf7d0" if status_value == "ACTIVE" else row_bg
-            cb = tk.Checkbutton(scroll_frame, variable=selected_var, bg=cb_color, activebackground=cb_color, bd=0, highlightthickness=0)
-            cb.grid(row=row_idx, column=0, sticky="nsew")
-            row_widgets["SELECTED"] = selected_var
-            row_widgets["CHECKBOX_WIDGET"] = cb
-            entry_widgets_by_row_id[row_id] = row_widgets
-
-            # Define static/system columns
-            static_columns = {"ID", "STRATEGY", "TABLE", "STATUS", "InstrumentToken", "InstrumentID", "InstrumentName"}
-
-            # Add "Select" column header
-            tk.Label(scroll_frame, text="Select", font=("Arial", 10, "bold"),
-                 bg="#1f2937", fg="white", borderwidth=1, relief="solid", width=10).grid(row=0, column=0, sticky="nsew")
-            for col_idx, col_name in enumerate(col_names):
-                val = row_data[col_idx]
-                is_static = col_name in static_columns
-                is_editable = col_name in editable_cols
-                entry = tk.Entry(scroll_frame, width=15, disabledforeground="black", justify="center", bg=row_bg, relief="flat")
-                val = row_data[col_idx]
-                entry.insert(0, val)
-
-                # Apply validation if editable
-                if col_name in editable_cols:
-                    # Find column type from schema
-                    col_type = next((col['type'] for col in schema_data if col['name'] == col_name), "TEXT")
-                    vcmd = entry.register(create_validator(col_type))
-                    entry.config(validate="key", validatecommand=(vcmd, '%P'))
-                    def save_edit(event, col=col_name, row=row_id, e_widget=entry):
-                        new_value = e_widget.get()
-                        conn2 = db_handler.sqlite3.connect("users.db")
-                        cur2 = conn2.cursor()
-                        try:
-                            cur2.execute(f'UPDATE {physical_table} SET "{col}" = ? WHERE ID = ?', (new_value, row))
-                            conn2.commit()
-                        except Exception as ex:
-                            print(f"❌ DB Update Error for {col}, ID={row}: {ex}")
-                        finally:
-                            conn2.close()
-
-                    entry.bind("<FocusOut>", save_edit)
                 else:
-                    # Make truly read-only (no cursor, no edits)
-                    entry.config(state="readonly", readonlybackground=row_bg, fg="black")
-
-                if is_static:
-                    header_bg = "#2e6291"  # Deep blue
-                    header_fg = "white"
-                elif is_editable:
-                    header_bg = "#489ad1"  # Amber/yellow
-                    header_fg = "black"
-                else:
-                    header_bg = "#3b82f6"  # Blue for readonly user-defined
-                    header_fg = "white"
+                    messagebox.showerror("TCP Error", f"❌ {response.get('message')}")
+                    update_row_ui_active(row_id)  # Update the row to ACTIVE
 
-                tk.Label(scroll_frame, text=col_name, font=("Arial", 10, "bold"),
-                        fg=header_fg, bg=header_bg, borderwidth=1, relief="solid", width=15).grid(row=0, column=col_idx + 1, sticky="nsew")
+                ui.coalesce(status_writes.flush)
+                ui.coalesce(update_strategy_status_display)
 
-                entry.grid(row=row_idx, column=col_idx+1, sticky="nsew", padx=1, pady=1)
-                if col_name in ["ID", "STATUS"]:
-                    row_widgets[col_name] = entry
-                else:
-                    row_widgets[col_name] = entry
-            
-            # Action Buttons: Apply, Stop, Delete
-            def make_apply_callback(row_widgets=row_widgets, physical_table=physical_table, row_id=row_data[col_indices["ID"]]):
-                def apply():
-                    # Show "WAITING" immediately when Apply is clicked
-                    update_row_ui_waiting(row_id)
-
-                    data = {col: entry.get() for col, entry in row_widgets.items() if isinstance(entry, tk.Entry)}
-                    data["strategy_name"] = data.get("STRATEGY", "")
-                    data["table_type"] = data.get("TABLE", "").lower()
-                    data["instrument_id"] = data.get("InstrumentID", "")
-                    data["instrument_name"] = data.get("InstrumentName", "")
-                    data["status"] = data.get("STATUS", "")
-
-                    # Build the TCP request
-                    command = {
-                        "action": "apply_strategy",
-                        "data": data
-                    }
-
-                    # Callback to update UI after TCP response
-                    def on_response(response):
-                        if response.get("status") == "success":
-                            
-                            update_row_ui_active(row_id)  # Update the row to ACTIVE
-                            # Update database status to ACTIVE
-                            conn = db_handler.sqlite3.connect("users.db")
-                            cur = conn.cursor()
-                            cur.execute(f"UPDATE {physical_table} SET STATUS = 'ACTIVE' WHERE ID = ?", (row_id,))
-                            conn.commit()
-                            conn.close()
-
-                        else:
-                            messagebox.showerror("TCP Error", f"❌ {response.get('message')}")
-                            update_row_ui_inactive(row_id)  # Update the row to INACTIVE
-
-                        update_strategy_status_display()
-                    send_tcp_command(command, callback=on_response)
-
-                return apply
-
-            def make_stop_callback(row_widgets=row_widgets, physical_table=physical_table, row_id=row_data[col_indices["ID"]]):
-                def stop():
-                    # Show "WAITING" immediately when Stop is clicked
-                    update_row_ui_waiting(row_id)
-
-                    data = {col: entry.get() for col, entry in row_widgets.items() if isinstance(entry, tk.Entry)}
-                    data["row_id"] = row_id
-                    data["table_type"] = data.get("TABLE", "")
-                    data["user_id"] = user_id
-                    data["workspace_id"] = workspace_id
-
-                    command = {
-                        "action": "stop_strategy",
-                        "data": data
-                    }
-
-                    def on_response(response):
-                        if response.get("status") == "success":
-                            update_row_ui_inactive(row_id)  # Update the row to INACTIVE
-                            # Update database status to INACTIVE
-                            conn = db_handler.sqlite3.connect("users.db")
-                            cur = conn.cursor()
-                            cur.execute(f"UPDATE {physical_table} SET STATUS = 'INACTIVE' WHERE ID = ?", (row_id,))
-                            conn.commit()
-                            conn.close()
-
-                        else:
-                            messagebox.showerror("TCP Error", f"❌ {response.get('message')}")
-                            update_row_ui_active(row_id)  # Update the row to ACTIVE
-
-                        update_strategy_status_display()
-
-                    send_tcp_command(command, callback=on_response)
-
-                return stop
-
-            def make_delete_callback(row_id=row_data[col_indices["ID"]]):
-                def delete():
-                    confirm = messagebox.askyesno("Delete", f"Delete row ID {row_id}?")
-                    if not confirm:
-                        return
-                    conn = db_handler.sqlite3.connect("users.db")
-                    cur = conn.cursor()
-                    cur.execute(f'DELETE FROM {physical_table} WHERE ID = ?', (row_id,))
-                    conn.commit()
-                    conn.close()
-                    refresh_tables(table_name)
-                return delete
-
-            action_col = len(col_names)+1
-            # Determine status to conditionally disable buttons
-            is_active = status_value == "ACTIVE"
-            is_inactive = status_value == "INACTIVE"
-
-            apply_btn = tk.Button(
-                scroll_frame,
-                text="✅",
-                bg="#22c55e",  # soft green
-                fg="white",
-                disabledforeground="#383838",
-                width=6,
-                font=("Arial", 10, "bold"),
-                command=make_apply_callback(),
-                state="disabled" if is_active else "normal",
-                relief="flat"
-            )
+            send_tcp_command(command, callback=on_response)
 
-            apply_btn.grid(row=row_idx, column=action_col, sticky="nsew")
+        def delete(row_id):
+            confirm = messagebox.askyesno("Delete", f"Delete row ID {row_id}?")
+            if not confirm:
+                return
+            conn = db_handler.connect()
+            strategy_store.delete_row(conn, table, row_id)
+            conn.commit()
+            conn.close()
+            status_counters.row_removed(table, row_id)
+            refresh_tables(table_name)
 
-            stop_btn = tk.Button(
-                scroll_frame,
-                text="⛔",
-                bg="#ef4444",  # soft red
-                fg="white",
-                disabledforeground="#383838",
-                width=6,
-                font=("Arial", 10, "bold"),
-                command=make_stop_callback(),
-                state="disabled" if is_inactive else "normal",
-                relief="flat"
-            )
+        # One Treeview for the whole table; cells are items, not widgets
+        grid = StrategyGrid(content_frame, col_names, editable=table.editable, validators=table.validators,
+                            on_apply=apply, on_stop=stop, on_delete=delete, on_edit=save_edit)
+        grid.pack(fill="both", expand=True)
 
-            stop_btn.grid(row=row_idx, column=action_col + 1, sticky="nsew")
+        def load_page(after_id, limit):
+            conn = db_handler.connect()
+            try:
+                return strategy_store.fetch_page(conn, table, after_id, limit)[1]
+            finally:
+                conn.close()
 
-            delete_btn = tk.Button(
-                scroll_frame,
-                text="🗑️",
-                bg="#848688",  # gray
-                fg="white",
-                disabledforeground="#383838",
-                width=6,
-                font=("Arial", 10, "bold"),
-                command=make_delete_callback(),
-                state="disabled" if is_active else "normal",
-                relief="flat"
-            )
+        # Rows stream in a page at a time as the user scrolls
+        grid.set_page_source(load_page)
+        grid_table, grid_version = table, version
 
-            delete_btn.grid(row=row_idx, column=action_col + 2, sticky="nsew")
+        update_strategy_status_display()
 
-            # Store the button references
-            row_widgets["apply_btn"] = apply_btn
-            row_widgets["stop_btn"] = stop_btn
-            row_widgets["delete_btn"] = delete_btn
+    def sync_table_display(table_name):
+        """Bring the grid up to date by re-reading only the rows changed since
+        it was drawn. Returns False when a full redraw is needed instead
+        (another table, an edited schema, or changes the log no longer holds).
+        """
+        nonlocal grid_version
+        if grid is None or grid_table is None or grid_table.table_name != table_name:
+            return False
+        status_writes.flush()
+
+        conn = db_handler.connect()
+        try:
+            table = strategy_store.lookup(conn, user_id, workspace_id, table_name)
+            # The cache hands out a new ref only after the group was edited
+            if table is not grid_table:
+                return False
+            version = strategy_store.changes.version(table)
+            changed = strategy_store.changes.changed_since(table, grid_version)
+            if changed is None:
+                return False
+            rows = strategy_store.fetch_rows(conn, table, changed)[1] if changed else []
+        finally:
+            conn.close()
 
-            update_strategy_status_display()
+        id_idx = grid.col_index["ID"]
+        present = set()
+        for row in rows:
+            present.add(str(row[id_idx]))
+            # Rows past the loaded pages arrive with their page
+            if grid.has_row(row[id_idx]) or grid.fully_loaded:
+                grid.upsert_row(row)
+        for row_id in changed - present:
+            grid.remove_row(row_id)  # deleted since the last sync
+        grid_version = version
+        return True
 
     def update_strategy_status_display():
         total = 0
         active = 0
 
-        conn = db_handler.sqlite3.connect("users.db")
-        cur = conn.cursor()
-
         selected_table = table_var.get()
         if not selected_table:
             status_label.config(text="No strategies available", fg="gray")
             return
 
-        cur.execute("SELECT physical_table_name FROM user_tables WHERE user_id=? AND workspace_id=? AND table_name=?",
-                    (user_id, workspace_id, selected_table))
-        result = cur.fetchone()
-        if not result:
+        table = strategy_store.lookup(None, user_id, workspace_id, selected_table)
+        if not table:
             status_label.config(text="Invalid table", fg="gray")
             return
 
-        physical_table = result[0]
         try:
-            cur.execute(f"SELECT STATUS FROM {physical_table}")
-            rows = cur.fetchall()
-            total = len(rows)
-            active = sum(1 for r in rows if r[0].upper() == "ACTIVE")
+            active, total = status_counters.get(table)
         except:
             total = 0
             active = 0
 
-        conn.close()
     
         # Update the status label text
         if total == 0:
@@ -1033,7 +966,7 @@ def open_workspace_layout(workspace_id, email, master_win=None, on_close_callbac
         # print(f"🟢 Updating strategy status: {active} / {total}")
 
     def refresh_tables(select_table_name=None):
-        conn = db_handler.sqlite3.connect("users.db")
+        conn = db_handler.connect()
         cur = conn.cursor()
 
         # Fetch all tables for this user/workspace
@@ -1062,6 +995,11 @@ def open_workspace_layout(workspace_id, email, master_win=None, on_close_callbac
         else:
             table_var.set("")
 
+        # Same table still on screen: apply only what changed
+        if tables and sync_table_display(table_var.get()):
+            update_strategy_status_display()
+            return
+
         # Clear content area
         for widget in content_frame.winfo_children():
             widget.destroy()
@@ -1125,6 +1063,16 @@ def open_workspace_layout(workspace_id, email, master_win=None, on_close_callbac
                 relief="flat", bd=0, padx=12, pady=6, cursor="hand2"
             )
 
+        elif act == "Bulk Add":
+            btn = tk.Button(
+                action_btns, text=act,
+                command=lambda: handle_bulk_add_rows(win, user_id, workspace_id, table_var.get(), refresh_tables),
+                bg="#16a34a", fg="white",
+                activebackground="#15803d", activeforeground="white",
+                font=("Arial", 10, "bold"),
+                relief="flat", bd=0, padx=12, pady=6, cursor="hand2"
+            )
+
         elif act == "Start All":
             btn = tk.Button(
                 action_btns, text=act,
@@ -1193,6 +1141,33 @@ def open_workspace_layout(workspace_id, email, master_win=None, on_close_callbac
                         bg=bg_color, fg="green", anchor="w", justify="left")
     status_label.pack(side="left")
 
+    # === TCP LATENCY PANEL ===
+    def dump_tcp_trace():
+        path = f"tcp_trace_{datetime.now():%Y%m%d_%H%M%S}.jsonl"
+        count = TRACES.dump_jsonl(path)
+        messagebox.showinfo("TCP Trace", f"Wrote {count} round trips to {path}")
+
+    tk.Button(status_frame, text="Dump Trace", command=dump_tcp_trace,
+              bg="#6b7280", fg="white", font=("Arial", 9, "bold"), relief="flat", bd=0, padx=8, pady=2).pack(side="right", padx=5)
+    latency_label = tk.Label(status_frame, text="TCP latency: no samples yet", font=("Arial", 10),
+                             bg=bg_color, fg=fg_color, anchor="e")
+    latency_label.pack(side="right")
+
+    def refresh_latency_panel():
+        try:
+            if not win.winfo_exists():
+                return
+            total = TRACES.percentiles("total_ms", (50, 99))
+            callback = TRACES.percentiles("callback_ms", (99,))
+            if total[50] is not None:
+                latency_label.config(text=f"TCP round trip p50 {total[50]:.1f} ms · p99 {total[99]:.1f} ms"
+                                          f" · callback p99 {callback[99]:.1f} ms")
+            win.after(1000, refresh_latency_panel)
+        except tk.TclError:
+            pass  # window closed
+
+    refresh_latency_panel()
+
     refresh_tables()
 
     return win
\ No newline at end of file